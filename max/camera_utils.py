@@ -1,24 +1,117 @@
 import configparser
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import cv2
 import numpy as np
 
-from picamera2 import Picamera2
+from picamera2 import MappedArray, Picamera2
 from picamera2.devices import IMX500
 from picamera2.devices.imx500 import NetworkIntrinsics, postprocess_nanodet_detection
 
-# Load configuration
-config = configparser.ConfigParser()
-config.read("config.ini")
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CameraConfig:
+    """Camera and detection settings from the [CAMERA] section of config.ini"""
+
+    model: str
+    height: int
+    width: int
+    iou: float
+    threshold: float
+    max_detections: int
+    inference_rate: int
+    # Labels are only needed for drawing detections, which the counter doesn't do
+    load_labels: bool = False
+    # Frame-similarity gate, see capture_frame_with_metadata
+    skip_hash_distance: int = 5
+    refresh_interval: int = 8
+
+
+def _load_config(config_path: str = "config.ini") -> CameraConfig:
+    """
+    Parse the camera settings once
+
+    Args:
+        config_path: Path to config file
+
+    Returns:
+        CameraConfig: Parsed camera settings
+    """
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    camera = config["CAMERA"]
+
+    return CameraConfig(
+        model=camera["model"],
+        height=camera.getint("height"),
+        width=camera.getint("width"),
+        iou=camera.getfloat("iou"),
+        threshold=camera.getfloat("threshold"),
+        max_detections=camera.getint("max_detections"),
+        inference_rate=camera.getint("inference_rate"),
+        load_labels=camera.getboolean("load_labels", fallback=False),
+        skip_hash_distance=camera.getint("skip_hash_distance", fallback=5),
+        refresh_interval=camera.getint("refresh_interval", fallback=8),
+    )
+
 
 # Camera settings
-model = config["CAMERA"]["model"]
-height = int(config["CAMERA"]["height"])
-width = int(config["CAMERA"]["width"])
-iou = float(config["CAMERA"]["iou"])
-threshold = float(config["CAMERA"]["threshold"])
-max_detections = int(config["CAMERA"]["max_detections"])
-inference_rate = int(config["CAMERA"]["inference_rate"])
+CFG = _load_config()
+
+# COCO class index for "person"; NanoDet rows start with the per-class scores
+PERSON_CLASS = 0
+
+# (width, height) of the display window. Local frames come from a lores
+# stream of this size so the ISP does the downscale
+DISPLAY_SIZE = (192, 192)
+
+# (width, height) of frames sent to the remote device, at most 640x480. The
+# main stream is configured at this size, so the ISP scales it too
+SEND_SIZE = (min(CFG.width, 640), min(CFG.height, 480))
+
+# Frame-similarity gate: frames whose perceptual hash differs from the last
+# detected frame by fewer than CFG.skip_hash_distance bits reuse its people
+# count, but detection is forced at least every CFG.refresh_interval frames
+_last_hash = None
+_last_count = 0
+_frames_since_refresh = 0
+
+# Detection runs off the capture path; its result is picked up a frame later
+_detect_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Detect")
+_pending_detection = None
+
+
+def _has_person_candidate(outputs: np.ndarray, th: float) -> bool:
+    """
+    Check whether any anchor scores a person above the threshold
+    :param outputs: raw detector output rows, shape (anchors, columns)
+    :param th: score threshold
+    :return: True if at least one anchor is a person candidate
+    """
+    for i in range(outputs.shape[0]):
+        if outputs[i, PERSON_CLASS] > th:
+            return True
+    return False
+
+
+if NUMBA_AVAILABLE:
+    # Compiled loop stops at the first candidate instead of building a mask
+    has_person_candidate = njit(cache=True)(_has_person_candidate)
+else:
+
+    def has_person_candidate(outputs: np.ndarray, th: float) -> bool:
+        return bool((outputs[:, PERSON_CLASS] > th).any())
 
 
 def init_camera() -> tuple[Picamera2, IMX500]:
@@ -26,62 +119,95 @@ def init_camera() -> tuple[Picamera2, IMX500]:
     Initialize the camera and the IMX500 object
     :return: tuple of Picamera2 and IMX500 objects
     """
-    logging.info("Initializing camera and IMX500")
+    logger.info("Initializing camera and IMX500")
 
     # This must be called before instantiation of Picamera2
-    imx500 = IMX500(model)
+    imx500 = IMX500(CFG.model)
     intrinsics = imx500.network_intrinsics
     if not intrinsics:
         intrinsics = NetworkIntrinsics()
         intrinsics.task = "object detection"
-        logging.info("Created new NetworkIntrinsics with object detection task")
+        logger.info("Created new NetworkIntrinsics with object detection task")
     elif intrinsics.task != "object detection":
-        logging.error("Network is not an object detection task")
+        logger.error("Network is not an object detection task")
         exit(1)
 
     # Defaults
-    if intrinsics.labels is None:
+    if intrinsics.labels is None and not CFG.load_labels:
+        # Placeholder names, one per NanoDet COCO class
+        intrinsics.labels = [""] * 80
+    elif intrinsics.labels is None:
         try:
-            with open("../assets/coco_labels.txt", "r") as f:
-                intrinsics.labels = f.read().splitlines()
-                logging.info(
+            with open("../assets/coco_labels.txt", "rb") as f:
+                intrinsics.labels = f.read().decode().splitlines()
+                logger.info(
                     f"Loaded {len(intrinsics.labels)} labels from coco_labels.txt"
                 )
         except Exception as e:
-            logging.error(f"Failed to load labels: {e}")
+            logger.error(f"Failed to load labels: {e}")
             exit(1)
 
     intrinsics.update_with_defaults()
-    intrinsics.inference_rate = inference_rate
+    intrinsics.inference_rate = CFG.inference_rate
 
-    logging.info(f"Camera configuration: {width}x{height} at {inference_rate} FPS")
-    logging.info(
-        f"Detection settings: IoU={iou}, threshold={threshold}, max_detections={max_detections}"
+    logger.info(
+        f"Camera configuration: {SEND_SIZE[0]}x{SEND_SIZE[1]} at {CFG.inference_rate} FPS"
+    )
+    logger.info(
+        f"Detection settings: IoU={CFG.iou}, threshold={CFG.threshold}, "
+        f"max_detections={CFG.max_detections}"
     )
 
     picam2 = Picamera2(imx500.camera_num)
     camera_config = picam2.create_preview_configuration(
         controls={"FrameRate": intrinsics.inference_rate},
         buffer_count=12,
-        main={"format": "XRGB8888", "size": (width, height)},
+        # 3-channel BGR, no padding byte. This is the frame that is sent
+        main={"format": "RGB888", "size": SEND_SIZE},
+        # Display-sized copy scaled by the ISP. RGB lores needs a Pi 5
+        lores={"format": "RGB888", "size": DISPLAY_SIZE},
     )
 
-    logging.info("Loading network firmware...")
+    logger.info("Loading network firmware...")
     imx500.show_network_fw_progress_bar()
 
     picam2.start(camera_config)
-    logging.info("Camera started successfully")
+    logger.info("Camera started successfully")
 
     if intrinsics.preserve_aspect_ratio:
         imx500.set_auto_aspect_ratio()
-        logging.info("Auto aspect ratio enabled")
+        logger.info("Auto aspect ratio enabled")
+
+    if NUMBA_AVAILABLE:
+        logger.info("Person candidate check: compiled with numba")
+    else:
+        logger.info(
+            "Person candidate check: NumPy. Install the numba extra to compile it"
+        )
+
+    # Compile the candidate check now rather than on the first frame
+    has_person_candidate(
+        np.zeros((1, PERSON_CLASS + 1), dtype=np.float32), CFG.threshold
+    )
 
     return picam2, imx500
 
 
-def get_num_people_local(metadata: dict, imx500: IMX500) -> int:
+def get_num_people_local(
+    metadata: dict,
+    imx500: IMX500,
+    *,
+    _th=CFG.threshold,
+    _iou=CFG.iou,
+    _md=CFG.max_detections,
+    _pp=postprocess_nanodet_detection,
+) -> int:
     """
     Get the number of people detected in the frame
+
+    The underscore keyword arguments bind the detection settings as locals
+    and are not meant to be passed by callers.
+
     :param metadata: metadata from the camera
     :param imx500: IMX500 object
     :return: number of people detected
@@ -92,102 +218,312 @@ def get_num_people_local(metadata: dict, imx500: IMX500) -> int:
         if np_outputs is None:
             return 0
 
-        _, scores, classes = postprocess_nanodet_detection(
-            outputs=np_outputs[0],
-            conf=threshold,
-            iou_thres=iou,
-            max_out_dets=max_detections,
-        )[0]
+        # Contiguous float32 once here, so the candidate check and the
+        # postprocess don't work on strided or float64 data
+        outputs = np.ascontiguousarray(np_outputs[0], dtype=np.float32)
 
-        # Parse how many people are in the frame
-        num_persons = 0
-        for score, category in zip(scores, classes):
-            if score > threshold and category == 0:  # Person class is typically 0
-                num_persons += 1
+        # With no anchor scoring a person above the threshold NMS cannot
+        # return one, so skip box decoding and NMS entirely
+        if not has_person_candidate(outputs.reshape(-1, outputs.shape[-1]), _th):
+            return 0
+
+        _, _, classes = _pp(
+            outputs=outputs,
+            conf=_th,
+            iou_thres=_iou,
+            max_out_dets=_md,
+        )[0]
 
-        return num_persons
+        # Parse how many people are in the frame. postprocess_nanodet_detection
+        # has already dropped detections below `_th`, so only the class
+        # needs checking.
+        return int(np.count_nonzero(np.asarray(classes) == PERSON_CLASS))
 
     except Exception as e:
-        logging.error(f"Error detecting people: {e}")
+        logger.error(f"Error detecting people: {e}")
         return 0
 
 
-def capture_frame(camera) -> np.ndarray:
+def capture_frame_and_metadata(camera, out: np.ndarray = None, with_display: bool = False):
     """
-    Capture a frame from the camera
+    Capture a frame and the metadata that belongs to it
+
+    Both come from the same completed request, so the metadata always
+    matches the frame and only one round-trip to libcamera is needed. The
+    frame is read straight out of the mapped camera buffer; when `out` is
+    given the frame is written into it instead of a newly allocated array.
 
     Args:
         camera: Picamera2 object
+        out: Optional preallocated array matching the main stream shape
+        with_display: Also copy the DISPLAY_SIZE lores frame from the request
+
+    Camera errors propagate to the caller's loop rather than being caught
+    on every frame.
 
     Returns:
-        numpy.ndarray: Captured frame or None if failed
+        tuple: (frame, metadata), or (frame, metadata, display_frame) with
+        with_display
     """
+    request = camera.capture_request()
     try:
-        frame = camera.capture_array()
-        if frame is None:
-            logging.error("Camera returned None frame")
-        else:
-            logging.debug(f"Captured frame with shape: {frame.shape}")
-        return frame
-    except Exception as e:
-        logging.error(f"Error capturing frame: {e}")
-        return None
+        metadata = request.get_metadata()
+        with MappedArray(request, "main") as mapped:
+            if out is None:
+                frame = mapped.array.copy()
+            else:
+                np.copyto(out, mapped.array)
+                frame = out
+        if with_display:
+            with MappedArray(request, "lores") as mapped:
+                display_frame = mapped.array.copy()
+    finally:
+        # Return the buffer to the camera as soon as it has been copied
+        request.release()
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Captured frame with shape: %s", frame.shape)
+    if with_display:
+        return frame, metadata, display_frame
+    return frame, metadata
+
+
+def capture_frame(camera, out: np.ndarray = None) -> np.ndarray:
+    """
+    Capture a frame from the camera
+
+    Args:
+        camera: Picamera2 object
+        out: Optional preallocated array matching the main stream shape
+
+    Returns:
+        numpy.ndarray: Captured frame
+    """
+    return capture_frame_and_metadata(camera, out)[0]
 
 
-def capture_frame_with_metadata(camera, imx500):
+def frame_hash(frame) -> int:
     """
-    Capture a frame and extract metadata including person detection
+    Compute a 64-bit average hash of a frame
 
     Args:
-        camera: Picamera2 object
-        imx500: IMX500 object
+        frame: Captured frame
 
     Returns:
-        tuple: (frame, people_count) or (None, 0) if failed
+        int: Hash with one bit per cell of an 8x8 luma thumbnail
     """
-    try:
-        # Capture frame
-        frame = capture_frame(camera)
-        if frame is None:
-            return None, 0
+    small = cv2.resize(frame, (8, 8), interpolation=cv2.INTER_AREA)
+    luma = small.mean(axis=2)
+    return int.from_bytes(np.packbits(luma > luma.mean()).tobytes(), "big")
 
-        # Get metadata and detect people
-        metadata = camera.capture_metadata()
-        people_count = get_num_people_local(metadata, imx500)
-        logging.info(f"Detected {people_count} people in frame")
 
-        return frame, people_count
-    except Exception as e:
-        logging.error(f"Error capturing frame with metadata: {e}")
-        return None, 0
+class CameraWorker(threading.Thread):
+    """
+    Background thread that captures frames and their metadata so camera
+    capture overlaps with detection and encoding in the consumer.
+
+    The worker is the only thread that reads the camera. Each capture
+    replaces the previous one in a single slot, so consumers always get the
+    newest frame and never a stale queued one.
+
+    Each capture copies the SEND_SIZE main frame, which is sent, and the
+    DISPLAY_SIZE lores frame, which is shown locally. Main-stream frames
+    are copied into a ring of preallocated arrays rather than a new array
+    per capture. The worker never writes into the published frame or into
+    the frame the consumer took with get() until the consumer calls
+    release(), so three buffers always leave one free.
+    """
 
+    def __init__(self, camera, state, ring_size: int = 3):
+        """
+        Initialize the camera worker.
+
+        Args:
+            camera: Picamera2 object
+            state: Application state
+            ring_size: Number of preallocated main-stream frame buffers, at
+                least 3
+        """
+        super().__init__(name="CameraWorker", daemon=True)
+        self.camera = camera
+        self.state = state
+        # (seq, frame, metadata) of the newest capture. It is replaced with a
+        # single assignment, so readers never see a half-written capture
+        self._slot = (0, None, None)
+        self._captured = threading.Condition()
+        self._last_read_seq = 0
+        # Seq of the last frame the consumer has released
+        self._released_seq = 0
+        self.ring_size = max(3, ring_size)
+        self.dropped_frames = 0
+        # Newest DISPLAY_SIZE frame, shared read-only with the display thread
+        self.latest_frame = None
+        self.frame_ready = state.get("frame_ready")
+
+    def run(self):
+        """Capture frames until the application stops"""
+        state = self.state
+        camera = self.camera
+        captured = self._captured
+        frame_ready = self.frame_ready
+        should_run = state.flag("should_run")
+        seq = 0
+        # Allocated from the first capture, once the stream shape is known
+        ring = None
+        # Seq of the capture held by each ring buffer
+        ring_seqs = [-1] * self.ring_size
+
+        while should_run.is_set():
+            try:
+                out = None
+                if ring is not None:
+                    # Under the lock get() takes, so a frame can't be taken
+                    # between these reads and the choice of buffer
+                    with captured:
+                        published = self._slot[0]
+                        held = self._last_read_seq
+                        if held == self._released_seq:
+                            held = None
+                    index = next(
+                        i for i, s in enumerate(ring_seqs)
+                        if s != published and s != held
+                    )
+                    out = ring[index]
+                # The small lores frames get a new array per capture: the
+                # display thread spots new frames by identity
+                frame, metadata, display_frame = capture_frame_and_metadata(
+                    camera, out=out, with_display=True
+                )
+                if ring is None:
+                    ring = [frame] + [
+                        np.empty_like(frame) for _ in range(self.ring_size - 1)
+                    ]
+                    index = 0
+                seq += 1
+                ring_seqs[index] = seq
+                self.latest_frame = display_frame
+                with captured:
+                    self._slot = (seq, frame, metadata)
+                    captured.notify()
+                if frame_ready is not None:
+                    with frame_ready:
+                        frame_ready.notify_all()
+            except Exception as e:
+                logger.error(f"Error in camera worker: {e}")
+                time.sleep(0.5)
+
+    def _has_new_capture(self) -> bool:
+        return self._slot[0] != self._last_read_seq
+
+    def get(self, timeout: float = 1.0):
+        """
+        Get the newest captured frame and its metadata
+
+        Waits only if the newest capture has already been read. Captures
+        that were replaced before being read are counted in dropped_frames.
+        The frame stays valid until release() or the next get(); the
+        previously returned frame is released implicitly.
+
+        Args:
+            timeout: Seconds to wait for a frame
+
+        Returns:
+            tuple: (frame, metadata) or (None, None) on timeout
+        """
+        with self._captured:
+            if not self._captured.wait_for(self._has_new_capture, timeout):
+                return None, None
+            seq, frame, metadata = self._slot
+            skipped = seq - self._last_read_seq - 1
+            self._last_read_seq = seq
+        if skipped > 0:
+            self.dropped_frames += skipped
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Consumer behind, dropped %d frames", self.dropped_frames)
+        return frame, metadata
+
+    def release(self):
+        """Report that the consumer has finished with the frame from get()"""
+        self._released_seq = self._last_read_seq
+
+
+def capture_frame_with_metadata(camera_worker, imx500):
+    """
+    Get a captured frame and extract metadata including person detection
+
+    Detection runs on a worker thread, so the returned count is the most
+    recent finished result and may lag the frame by one detection.
 
-def get_frame_for_display(camera, state):
+    Args:
+        camera_worker: CameraWorker object
+        imx500: IMX500 object
+
+    Returns:
+        tuple: (frame, people_count) or (None, 0) if no frame was captured
+    """
+    global _last_hash, _last_count, _pending_detection, _frames_since_refresh
+
+    # Get the next frame from the capture thread
+    frame, metadata = camera_worker.get()
+    if frame is None:
+        return None, 0
+
+    # Pick up the previous detection if it has finished. get_num_people_local
+    # handles its own errors, so result() doesn't raise here
+    if _pending_detection is not None and _pending_detection.done():
+        _last_count = _pending_detection.result()
+        _pending_detection = None
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Detected %d people in frame", _last_count)
+
+    # Don't queue up work while a detection is still running. Only the newest
+    # count is ever used, so frames arriving meanwhile are skipped rather than
+    # batched into a later postprocess call
+    if _pending_detection is not None:
+        return frame, _last_count
+
+    # Reuse the last count if the scene hasn't changed
+    h = frame_hash(frame)
+    _frames_since_refresh += 1
+    if (
+        _last_hash is not None
+        and _frames_since_refresh < CFG.refresh_interval
+        and (h ^ _last_hash).bit_count() < CFG.skip_hash_distance
+    ):
+        return frame, _last_count
+
+    # Detect people in the background
+    _pending_detection = _detect_pool.submit(get_num_people_local, metadata, imx500)
+    _last_hash = h
+    _frames_since_refresh = 0
+    return frame, _last_count
+
+
+def get_frame_for_display(camera_worker, state):
     """
     Get the appropriate frame for display based on application state
 
+    Local frames are the newest lores capture from the camera worker rather
+    than a second capture_request, already scaled to DISPLAY_SIZE by the ISP.
+    Remote frames are scaled by the receive thread. OpenCV releases the GIL
+    in imshow and waitKey, so the display thread does almost no work under
+    the GIL. Frames are shared between threads, so callers must not modify
+    them.
+
     Args:
-        camera: Picamera2 object
+        camera_worker: CameraWorker object
         state: Application state
 
     Returns:
         numpy.ndarray: Frame to display
     """
-    try:
-        display_local = state["display_local"]
-        remote_frame = state.get("remote_frame")
-
-        if display_local or remote_frame is None:
-            # Display local frame
-            frame = capture_frame(camera)
-            logging.debug("Using local frame for display")
-        else:
-            # Display remote frame
-            frame = remote_frame
-            logging.debug("Using remote frame for display")
-
-        return frame
-    except Exception as e:
-        logging.error(f"Error getting frame for display: {e}")
-        # Fallback to local frame on error
-        return capture_frame(camera)
+    remote_frame = state.get("remote_frame")
+
+    if remote_frame is not None and not state["display_local"]:
+        # Display remote frame without touching the camera
+        logger.debug("Using remote frame for display")
+        return remote_frame
+
+    # Display local frame
+    logger.debug("Using local frame for display")
+    return camera_worker.latest_frame
@@ -3,25 +3,30 @@ import logging
 import queue
 import threading
 import atexit
+import collections
+import colorsys
+import functools
+import pickle
+import select
+import struct
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Callable, Dict, List, Any
 from enum import Enum
 
+import numpy as np
+
 try:
     import adafruit_pixelbuf
     import board
-    from adafruit_led_animation.animation.rainbow import Rainbow
     from adafruit_led_animation.animation.rainbowchase import RainbowChase
-    from adafruit_led_animation.animation.rainbowcomet import RainbowComet
     from adafruit_led_animation.animation.rainbowsparkle import RainbowSparkle
-    from adafruit_led_animation.animation.sparklepulse import SparklePulse
-    from adafruit_led_animation.animation.solid import Solid
     from adafruit_raspberry_pi5_neopixel_write import neopixel_write
     NEOPIXEL_AVAILABLE = True
 except ImportError:
     logging.warning("NeoPixel libraries not available - LED functionality disabled")
     NEOPIXEL_AVAILABLE = False
 
+from log_utils import start_log_listener
 from state_class import ThreadSafeState
 
 # LED Configuration
@@ -37,8 +42,47 @@ LED_STRANDS = {
     },
 }
 
+# Animation speed indexed by people count, last entry for that many or more
+_SPEED_LUT = (
+    0.05,  # Very slow when no one is around
+    0.025,  # Normal speed for one person
+    0.01,  # Faster for two people
+    0.0025,  # Fast for three people
+    0.005,  # Very fast for four or more people
+)
+
+# Prebuilt commands for the parameterless queue helpers. These are shared, so
+# command handlers must treat commands as read-only
+_CMD_POOL = {
+    'set_all_active_on': {'type': 'set_all_active', 'active': True},
+    'set_all_active_off': {'type': 'set_all_active', 'active': False},
+    'turn_off_all': {'type': 'turn_off_all'},
+    'shutdown': {'type': 'shutdown'},
+}
+_POOLED_COMMAND_IDS = frozenset(id(command) for command in _CMD_POOL.values())
+
+# Wire format for commands sent to led_control_process over its pipe. The
+# frequent fixed-size commands are packed as a 1-byte opcode and a signed
+# 16-bit payload; anything else is pickled. Pickles start with the protocol
+# marker 0x80, which is never used as an opcode
+_WIRE_COMMAND = struct.Struct('<Bh')
+_WIRE_OPCODES = {
+    'set_all_active': 1,
+    'set_people_count': 2,
+    'turn_off_all': 3,
+    'shutdown': 4,
+}
+_PICKLE_MARKER = 0x80
+
+# Recycled dicts for parameterized thread-queue commands
+_command_freelist = collections.deque(maxlen=32)
+
+# Module logger for the frame-loop paths; debug calls there use lazy
+# %-formatting so nothing is formatted while debug is off
+_logger = logging.getLogger(__name__)
+
 # Global flags for safe shutdown
-_shutdown_requested = False
+_shutdown_event = threading.Event()
 _led_controller = None
 
 
@@ -52,37 +96,289 @@ class AnimationType(Enum):
     SOLID = "solid"
 
 
+# Value -> member map, bypassing the Enum constructor on every lookup
+_ANIM_BY_VALUE = {member.value: member for member in AnimationType}
+
+
+def _animation_type(value: str) -> AnimationType:
+    """Look up an AnimationType by value, raising ValueError like AnimationType(value)"""
+    try:
+        return _ANIM_BY_VALUE[value]
+    except KeyError:
+        raise ValueError(f"{value!r} is not a valid AnimationType") from None
+
+
 class Pi5PixelBuf(adafruit_pixelbuf.PixelBuf):
     """Custom PixelBuf implementation for Raspberry Pi 5 with safety checks"""
     
-    def __init__(self, pin, size, **kwargs):
+    def __init__(self, pin, size, auto_write=False, **kwargs):
         self._pin = pin
-        self._last_transmit_time = 0
-        self._min_transmit_interval = 0.005  # Increased from 1ms to 5ms to reduce stuttering
-        super().__init__(size=size, **kwargs)
+        # auto_write is off by default so a frame is sent with one show() call
+        # instead of one transmit per pixel change
+        super().__init__(size=size, auto_write=auto_write, **kwargs)
+        # (pixels, 3) view onto the transmit buffer for whole-frame writes and
+        # the byte position of R, G and B within a pixel. The view relies on
+        # PixelBuf internals, so it is only built for a plain 3-byte layout
+        # when those internals are present; otherwise set_frame() and show()
+        # go through the public PixelBuf API
+        self._frame_view = None
+        self._frame_order = None
+        self._tx_mv = None
+        bpp, order, _, dotstar_mode = self.parse_byteorder(self.byteorder)
+        buf = getattr(self, "_post_brightness_buffer", None)
+        offset = getattr(self, "_offset", None)
+        if (
+            bpp == 3
+            and not dotstar_mode
+            and isinstance(buf, bytearray)
+            and isinstance(offset, int)
+            and len(buf) >= offset + size * 3
+        ):
+            self._frame_view = np.frombuffer(
+                buf, dtype=np.uint8, count=size * 3, offset=offset
+            ).reshape(size, 3)
+            self._frame_order = list(order)
+            # Handed to neopixel_write on every show() instead of the bytearray
+            self._tx_mv = memoryview(buf)
+        else:
+            _logger.warning(
+                "PixelBuf layout %r not supported for frame writes, using per-pixel writes",
+                self.byteorder,
+            )
+        # Copy of the last transmitted frame; None until the first show()
+        self._last_frame = None
+
+    def show(self):
+        """Transmit the buffer through the cached memoryview, skipping unchanged frames"""
+        if self._tx_mv is None:
+            super().show()
+            return
+        if self._last_frame is not None and self._tx_mv == self._last_frame:
+            return
+        self._transmit(self._tx_mv)
+        if self._last_frame is None:
+            self._last_frame = bytearray(self._tx_mv)
+        else:
+            self._last_frame[:] = self._tx_mv
+
+    def set_frame(self, frame: np.ndarray):
+        """Copy a whole (pixels, 3) uint8 RGB frame into the buffer in one operation"""
+        if (
+            self._frame_view is not None
+            and getattr(self, "_pre_brightness_buffer", None) is None
+        ):
+            # Scatter R, G and B to their positions in the byteorder
+            self._frame_view[:, self._frame_order] = frame
+        else:
+            # Brightness scaling and other layouts are handled per pixel by PixelBuf
+            self[:] = frame.tolist()
 
     def _transmit(self, buf):
         """Transmit data with safety checks - NO THREADING"""
-        global _shutdown_requested
-        
         # Skip if shutdown requested
-        if _shutdown_requested:
-            return
-            
-        # Throttle transmissions to prevent overwhelming hardware
-        current_time = time.time()
-        if current_time - self._last_transmit_time < self._min_transmit_interval:
+        if _shutdown_event.is_set():
             return
             
         try:
             # Direct hardware call - no threading to avoid segfaults
             neopixel_write(self._pin, buf)
-            self._last_transmit_time = current_time
         except Exception as e:
             logging.error(f"Hardware transmit error on pin {self._pin}: {e}")
             # Don't re-raise - let the system continue
 
 
+def _build_hue_lut() -> np.ndarray:
+    """Build a 256-entry hue wheel as a (256, 3) uint8 RGB table"""
+    lut = np.empty((256, 3), dtype=np.uint8)
+    for hue in range(256):
+        r, g, b = colorsys.hsv_to_rgb(hue / 256, 1.0, 1.0)
+        lut[hue] = (int(r * 255), int(g * 255), int(b * 255))
+    return lut
+
+
+# Hue wheel shared by all NumPy animations, built once at import
+_HUE_LUT = _build_hue_lut()
+
+
+@functools.lru_cache(maxsize=None)
+def _tail_lut(tail_length: int) -> np.ndarray:
+    """
+    Precompute comet tails as a (256, tail_length, 3) uint8 table indexed by
+    head hue, with the hue advancing and brightness fading along the tail
+    """
+    offsets = np.arange(tail_length)
+    hue_step = max(1, 256 // tail_length)
+    hues = (np.arange(256)[:, None] + offsets[None, :] * hue_step) & 0xFF
+    fade = np.linspace(1.0, 0.0, tail_length, endpoint=False)
+    return (_HUE_LUT[hues] * fade[None, :, None]).astype(np.uint8)
+
+
+def _install_colorwheel_lut():
+    """
+    Point the adafruit rainbow animations at a precomputed colorwheel table
+    instead of recomputing each colour on demand
+    """
+    from adafruit_led_animation import color
+    from adafruit_led_animation.animation import rainbow, rainbowchase, rainbowsparkle
+
+    original = color.colorwheel
+    table = tuple(original(pos) for pos in range(256))
+
+    def colorwheel(pos):
+        # Only in-range ints come from the table, so floats and out-of-range
+        # positions (black) behave exactly as in the original
+        if type(pos) is int and 0 <= pos <= 255:
+            return table[pos]
+        return original(pos)
+
+    for module in (rainbow, rainbowchase, rainbowsparkle):
+        if hasattr(module, "colorwheel"):
+            module.colorwheel = colorwheel
+
+
+if NEOPIXEL_AVAILABLE:
+    _install_colorwheel_lut()
+
+
+class NumpyAnimation:
+    """
+    Base class for animations rendered into a NumPy framebuffer.
+
+    Mirrors the adafruit_led_animation interface used by LEDStrand
+    (animate(show=...) and a mutable speed) but renders the whole strand
+    with array operations and hands it to the PixelBuf in one copy.
+    """
+    
+    def __init__(self, pixels: Pi5PixelBuf, speed: float):
+        self.pixels = pixels
+        self.speed = speed
+        self.num_pixels = len(pixels)
+        self.fb = np.zeros((self.num_pixels, 3), dtype=np.uint8)
+        self.rgb_lut = _HUE_LUT
+        self._next_update = 0.0
+    
+    def draw(self):
+        """Render the next frame into self.fb"""
+        raise NotImplementedError
+    
+    def animate(self, show: bool = True) -> bool:
+        """Render a frame if one is due, return True if the buffer changed"""
+        now = time.monotonic()
+        if now < self._next_update:
+            return False
+        self._next_update = now + self.speed
+        
+        self.draw()
+        self.pixels.set_frame(self.fb)
+        if show:
+            self.pixels.show()
+        return True
+
+
+class NumpyRainbowComet(NumpyAnimation):
+    """Rainbow-coloured comet with a fading tail that wraps around the strand"""
+    
+    def __init__(self, pixels: Pi5PixelBuf, speed: float, tail_length: int = 7):
+        super().__init__(pixels, speed)
+        self.tail_length = min(tail_length, self.num_pixels)
+        self._offsets = np.arange(self.tail_length)
+        self._tail_lut = _tail_lut(self.tail_length)
+        self._head = 0
+        self._hue = 0
+    
+    def draw(self):
+        fb = self.fb
+        fb.fill(0)
+        
+        positions = (self._head - self._offsets) % self.num_pixels
+        fb[positions] = self._tail_lut[self._hue]
+        
+        self._head = (self._head + 1) % self.num_pixels
+        self._hue = (self._hue + 1) & 0xFF
+
+
+class NumpyRainbow(NumpyAnimation):
+    """The full hue wheel spread along the strand, rotating once every `period` seconds"""
+    
+    def __init__(self, pixels: Pi5PixelBuf, speed: float, period: float = 2):
+        super().__init__(pixels, speed)
+        self.period = period
+        # Hue of each pixel at phase 0
+        self._base_hues = np.arange(self.num_pixels) * 256 // self.num_pixels
+    
+    def draw(self):
+        offset = int((time.monotonic() % self.period) / self.period * 256)
+        self.fb[:] = self.rgb_lut[(self._base_hues + offset) & 0xFF]
+
+
+class NumpySolid(NumpyAnimation):
+    """Every pixel one colour"""
+    
+    def __init__(self, pixels: Pi5PixelBuf, color: tuple, speed: float = 1):
+        super().__init__(pixels, speed)
+        self.color = color
+    
+    @property
+    def color(self) -> tuple:
+        return self._color
+    
+    @color.setter
+    def color(self, color: tuple):
+        self._color = color
+        self.fb[:] = color
+        # Show the new colour on the next frame instead of after `speed`
+        self._next_update = 0.0
+    
+    def draw(self):
+        pass  # fb is filled when the colour is set
+
+
+class NumpySparklePulse(NumpyAnimation):
+    """Random sparkles of one colour whose brightness pulses over `period` seconds"""
+    
+    def __init__(self, pixels: Pi5PixelBuf, speed: float, color: tuple,
+                 period: float = 5, num_sparkles: Optional[int] = None,
+                 max_intensity: float = 1.0, min_intensity: float = 0.0):
+        super().__init__(pixels, speed)
+        self.color = color
+        self.period = period
+        self.num_sparkles = num_sparkles or max(1, self.num_pixels // 10)
+        self.max_intensity = max_intensity
+        self.min_intensity = min_intensity
+        self._rng = np.random.default_rng()
+    
+    @property
+    def color(self) -> tuple:
+        return self._color
+    
+    @color.setter
+    def color(self, color: tuple):
+        self._color = color
+        self._color_array = np.array(color, dtype=np.float32)
+    
+    def draw(self):
+        phase = (time.monotonic() % self.period) / self.period
+        intensity = self.min_intensity + (self.max_intensity - self.min_intensity) * (
+            0.5 - 0.5 * np.cos(2 * np.pi * phase)
+        )
+        
+        fb = self.fb
+        fb.fill(0)
+        sparkles = self._rng.choice(self.num_pixels, size=self.num_sparkles, replace=False)
+        fb[sparkles] = self._color_array * intensity
+
+
+# Animation constructors keyed by type, each called as factory(pixels, speed, color)
+_ANIM_FACTORIES = {
+    AnimationType.RAINBOW: lambda px, sp, c: NumpyRainbow(px, speed=sp, period=2),
+    AnimationType.RAINBOW_CHASE: lambda px, sp, c: RainbowChase(px, speed=sp, size=5, spacing=3),
+    AnimationType.RAINBOW_COMET: lambda px, sp, c: NumpyRainbowComet(px, speed=sp, tail_length=7),
+    AnimationType.RAINBOW_SPARKLE: lambda px, sp, c: RainbowSparkle(px, speed=sp, num_sparkles=15),
+    AnimationType.SPARKLE_PULSE: lambda px, sp, c: NumpySparklePulse(px, speed=sp, color=c),
+    AnimationType.SOLID: lambda px, sp, c: NumpySolid(px, color=c),
+}
+
+
 class LEDStrand:
     """Manages a single LED strand with its own animation and state"""
     
@@ -90,7 +386,7 @@ class LEDStrand:
         self.name = name
         self.pin = pin
         self.num_pixels = num_pixels
-        self.animation_type = AnimationType(animation_type)
+        self.animation_type = _animation_type(animation_type)
         self.pixels = None
         self.animation = None
         self.is_active = False
@@ -105,14 +401,13 @@ class LEDStrand:
     
     def _init_hardware(self) -> bool:
         """Initialize the NeoPixel hardware for this strand"""
-        if not NEOPIXEL_AVAILABLE or _shutdown_requested:
+        if not NEOPIXEL_AVAILABLE or _shutdown_event.is_set():
             return False
             
         try:
             self.pixels = Pi5PixelBuf(
                 self.pin, 
                 self.num_pixels, 
-                auto_write=True, 
                 byteorder="RGB"
             )
             logging.info(f"Initialized LED strand '{self.name}' with {self.num_pixels} pixels on pin {self.pin}")
@@ -130,22 +425,13 @@ class LEDStrand:
         speed = kwargs.get('speed', self.current_speed)
         color = kwargs.get('color', self.current_color)
         
+        factory = _ANIM_FACTORIES.get(animation_type)
+        if factory is None:
+            logging.warning(f"Unknown animation type: {animation_type}")
+            return None
+        
         try:
-            if animation_type == AnimationType.RAINBOW:
-                return Rainbow(self.pixels, speed=speed, period=2)
-            elif animation_type == AnimationType.RAINBOW_CHASE:
-                return RainbowChase(self.pixels, speed=speed, size=5, spacing=3)
-            elif animation_type == AnimationType.RAINBOW_COMET:
-                return RainbowComet(self.pixels, speed=speed, tail_length=7, bounce=False)
-            elif animation_type == AnimationType.RAINBOW_SPARKLE:
-                return RainbowSparkle(self.pixels, speed=speed, num_sparkles=15)
-            elif animation_type == AnimationType.SPARKLE_PULSE:
-                return SparklePulse(self.pixels, speed=speed, color=color)
-            elif animation_type == AnimationType.SOLID:
-                return Solid(self.pixels, color=color)
-            else:
-                logging.warning(f"Unknown animation type: {animation_type}")
-                return None
+            return factory(self.pixels, speed, color)
         except Exception as e:
             logging.error(f"Failed to create {animation_type} animation for '{self.name}': {e}")
             return None
@@ -161,7 +447,7 @@ class LEDStrand:
             return False
             
         try:
-            new_type = AnimationType(animation_type)
+            new_type = _animation_type(animation_type)
             self.animation_type = new_type
             self.animation = self._create_animation(new_type, **kwargs)
             self._animate_error_count = 0
@@ -180,8 +466,12 @@ class LEDStrand:
         
         if self.current_speed != speed:
             self.current_speed = speed
-            self.animation = self._create_animation(self.animation_type, speed=speed)
-            logging.debug(f"Set strand '{self.name}' speed to {speed}")
+            # Update in place so the animation keeps its position and hue
+            if self.animation is not None:
+                self.animation.speed = speed
+            else:
+                self.animation = self._create_animation(self.animation_type, speed=speed)
+            _logger.debug("Set strand '%s' speed to %s", self.name, speed)
         return True
     
     def set_color(self, color: tuple) -> bool:
@@ -191,9 +481,12 @@ class LEDStrand:
             
         if self.current_color != color:
             self.current_color = color
-            if self.animation_type in [AnimationType.SPARKLE_PULSE, AnimationType.SOLID]:
-                self.animation = self._create_animation(self.animation_type, color=color)
-                logging.debug(f"Set strand '{self.name}' color to {color}")
+            if self.animation_type in (AnimationType.SPARKLE_PULSE, AnimationType.SOLID):
+                if self.animation is not None:
+                    self.animation.color = color
+                else:
+                    self.animation = self._create_animation(self.animation_type, color=color)
+                _logger.debug("Set strand '%s' color to %s", self.name, color)
         return True
     
     def set_active(self, active: bool):
@@ -205,16 +498,16 @@ class LEDStrand:
     
     def turn_off(self):
         """Turn off this strand safely"""
-        if self.pixels and not self._disabled and not _shutdown_requested:
+        if self.pixels and not self._disabled and not _shutdown_event.is_set():
             try:
                 self.pixels.fill(0)
-                # Let the auto_write handle the transmission
+                self.pixels.show()
             except Exception as e:
                 logging.error(f"Error turning off strand '{self.name}': {e}")
     
     def animate(self) -> bool:
         """Animate one frame for this strand with error protection"""
-        if (self._disabled or _shutdown_requested or 
+        if (self._disabled or _shutdown_event.is_set() or 
             not (self.pixels and self.animation and self.is_active)):
             return True
             
@@ -225,7 +518,8 @@ class LEDStrand:
             return False
             
         try:
-            self.animation.animate()
+            # Render only; the controller sends the frame with show()
+            self.animation.animate(show=False)
             self._animate_error_count = 0
             return True
             
@@ -240,6 +534,41 @@ class LEDStrand:
             
             return False
 
+    def show(self):
+        """Send this strand's rendered frame to the hardware"""
+        if (self._disabled or _shutdown_event.is_set() or 
+            not (self.pixels and self.animation and self.is_active)):
+            return
+            
+        try:
+            self.pixels.show()
+        except Exception as e:
+            logging.error(f"Error showing strand '{self.name}': {e}")
+
+    def render_key(self) -> Optional[tuple]:
+        """
+        Key identifying the frames this strand renders, or None if it can't share them.
+
+        Strands with equal keys run the same NumPy animation with the same
+        settings, so one render can be copied to all of them.
+        """
+        if (self._disabled or not isinstance(self.animation, NumpyAnimation) or
+            not (self.pixels and self.is_active)):
+            return None
+        return (self.animation_type, self.current_speed, self.current_color, self.num_pixels)
+
+    def copy_frame_from(self, source: 'LEDStrand') -> bool:
+        """Load the frame last rendered by source instead of rendering our own"""
+        if _shutdown_event.is_set():
+            return True
+            
+        try:
+            self.pixels.set_frame(source.animation.fb)
+            return True
+        except Exception as e:
+            logging.error(f"Error copying frame to strand '{self.name}': {e}")
+            return False
+
 
 class LEDController:
     """Manages multiple LED strands"""
@@ -253,7 +582,7 @@ class LEDController:
         
         # Initialize all configured strands
         for name, config in configs.items():
-            if NEOPIXEL_AVAILABLE and not _shutdown_requested:
+            if NEOPIXEL_AVAILABLE and not _shutdown_event.is_set():
                 strand = LEDStrand(
                     name=name,
                     pin=config['pin'],
@@ -262,6 +591,9 @@ class LEDController:
                 )
                 self.strands[name] = strand
                 logging.info(f"Added LED strand: {name}")
+        
+        # Strands are fixed after construction; iterate a tuple in animate_all
+        self._strands_tuple = tuple(self.strands.values())
     
     def get_strand_names(self) -> List[str]:
         """Get list of all strand names"""
@@ -273,7 +605,7 @@ class LEDController:
     
     def set_all_active(self, active: bool):
         """Set active state for all strands"""
-        if _shutdown_requested:
+        if _shutdown_event.is_set():
             return
             
         self.is_active = active
@@ -283,7 +615,7 @@ class LEDController:
     
     def set_strand_active(self, name: str, active: bool) -> bool:
         """Set active state for a specific strand"""
-        if _shutdown_requested:
+        if _shutdown_event.is_set():
             return False
             
         strand = self.strands.get(name)
@@ -295,17 +627,32 @@ class LEDController:
     
     def animate_all(self) -> int:
         """Animate all active strands, return number of successful animations"""
-        if _shutdown_requested:
+        if _shutdown_event.is_set():
             return 0
             
+        # LEDStrand.animate and show handle their own errors. Transmits stay
+        # on this thread: the Pi 5 neopixel_write drives the RP1 directly and
+        # is not safe to call from worker threads
         successful_animations = 0
         
-        for strand in self.strands.values():
-            try:
-                if strand.animate():
-                    successful_animations += 1
-            except Exception as e:
-                logging.error(f"Critical error animating strand '{strand.name}': {e}")
+        if len(self._strands_tuple) == 1:
+            for strand in self._strands_tuple:
+                successful_animations += strand.animate()
+                strand.show()
+            return successful_animations
+        
+        # Identically configured strands render once and share the frame
+        rendered: Dict[tuple, LEDStrand] = {}
+        for strand in self._strands_tuple:
+            key = strand.render_key()
+            source = rendered.get(key) if key is not None else None
+            if source is not None:
+                successful_animations += strand.copy_frame_from(source)
+            else:
+                successful_animations += strand.animate()
+                if key is not None:
+                    rendered[key] = strand
+            strand.show()
         
         return successful_animations
     
@@ -314,22 +661,29 @@ class LEDController:
         for strand in self.strands.values():
             strand.turn_off()
     
-    def emergency_shutdown(self):
-        """Emergency shutdown - just fill with zeros, no complex operations"""
-        global _shutdown_requested
-        _shutdown_requested = True
+    def emergency_shutdown(self, timeout: float = 0.1):
+        """Emergency shutdown - write one zero buffer per pin, giving up after timeout seconds"""
+        _shutdown_event.set()
         
-        for strand in self.strands.values():
-            if strand.pixels:
-                try:
-                    strand.pixels.fill(0)
-                    # Don't force show() - let auto_write handle it
-                except:
-                    pass  # Ignore all errors during emergency shutdown
+        # Bypass PixelBuf entirely: Pi5PixelBuf._transmit is a no-op once
+        # shutdown is set, and brightness or dedup must not hold back the
+        # blank frame. Writes stay on this thread (RP1 is not thread safe),
+        # so the deadline is checked between pins
+        deadline = time.monotonic() + timeout
+        for strand in self._strands_tuple:
+            if strand.pixels is None:
+                continue
+            if time.monotonic() > deadline:
+                logging.warning("LED emergency shutdown timed out before all strands were cleared")
+                break
+            try:
+                neopixel_write(strand.pin, bytes(strand.num_pixels * strand.pixels._bpp))
+            except:
+                pass  # Ignore all errors during emergency shutdown
     
     def set_people_count(self, people_count: int):
         """Update animations based on people count for responsive strands"""
-        if _shutdown_requested:
+        if _shutdown_event.is_set():
             return
             
         for name, strand in self.strands.items():
@@ -341,8 +695,8 @@ class LEDController:
 
 def _emergency_cleanup():
     """Emergency cleanup function"""
-    global _shutdown_requested, _led_controller
-    _shutdown_requested = True
+    global _led_controller
+    _shutdown_event.set()
     
     if _led_controller:
         _led_controller.emergency_shutdown()
@@ -393,24 +747,15 @@ def is_active_time() -> bool:
 
 def get_speed_for_people_count(people_count: int) -> float:
     """Calculate animation speed based on number of people"""
-    speed_map = {
-        0: 0.05, #Very slow when no one is around
-        1: 0.025,  # Normal speed for one person
-        2: 0.01,  # Faster for two people
-        3: 0.0025,  # Fast for three people
-        5: 0.005,  # Very fast for four or more people
-    }
-    
-    if people_count >= max(speed_map.keys()):
-        return speed_map[max(speed_map.keys())]
-    
-    return speed_map.get(people_count)
+    if people_count < 0:
+        return _SPEED_LUT[1]
+    return _SPEED_LUT[min(people_count, len(_SPEED_LUT) - 1)]
 
 
 # High-level functional interface
 def set_all_active(active: bool) -> bool:
     """Set active state for all LED strands"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         _led_controller.set_all_active(active)
         return True
     return False
@@ -418,14 +763,14 @@ def set_all_active(active: bool) -> bool:
 
 def set_strand_active(strand_name: str, active: bool) -> bool:
     """Set active state for a specific strand"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         return _led_controller.set_strand_active(strand_name, active)
     return False
 
 
 def set_strand_animation(strand_name: str, animation_type: str, **kwargs) -> bool:
     """Set animation type for a specific strand"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         strand = _led_controller.get_strand(strand_name)
         if strand:
             return strand.set_animation_type(animation_type, **kwargs)
@@ -434,7 +779,7 @@ def set_strand_animation(strand_name: str, animation_type: str, **kwargs) -> boo
 
 def set_strand_speed(strand_name: str, speed: float) -> bool:
     """Set animation speed for a specific strand"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         strand = _led_controller.get_strand(strand_name)
         if strand:
             return strand.set_speed(speed)
@@ -443,7 +788,7 @@ def set_strand_speed(strand_name: str, speed: float) -> bool:
 
 def set_strand_color(strand_name: str, color: tuple) -> bool:
     """Set color for a specific strand"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         strand = _led_controller.get_strand(strand_name)
         if strand:
             return strand.set_color(color)
@@ -452,7 +797,7 @@ def set_strand_color(strand_name: str, color: tuple) -> bool:
 
 def set_people_count(people_count: int) -> bool:
     """Update people-responsive strands based on people count"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         _led_controller.set_people_count(people_count)
         return True
     return False
@@ -460,7 +805,7 @@ def set_people_count(people_count: int) -> bool:
 
 def animate_leds() -> bool:
     """Animate all LED strands with safety checks"""
-    if _led_controller and not _shutdown_requested:
+    if _led_controller and not _shutdown_event.is_set():
         try:
             successful_animations = _led_controller.animate_all()
             return successful_animations > 0 or len(_led_controller.strands) == 0
@@ -483,57 +828,94 @@ def get_strand_names() -> List[str]:
     return []
 
 
+def _acquire_command(cmd_type: str) -> dict:
+    """Get an empty command dict from the freelist, or a new one"""
+    try:
+        command = _command_freelist.pop()
+        command.clear()
+    except IndexError:
+        command = {}
+    command['type'] = cmd_type
+    return command
+
+
+def _release_command(command: dict):
+    """Return a processed or dropped command dict to the freelist"""
+    if id(command) not in _POOLED_COMMAND_IDS:
+        _command_freelist.append(command)
+
+
+def _cmd_set_all_active(command: dict):
+    set_all_active(command.get('active', True))
+
+
+def _cmd_set_strand_active(command: dict):
+    set_strand_active(command.get('strand'), command.get('active', True))
+
+
+def _cmd_set_strand_animation(command: dict):
+    set_strand_animation(command.get('strand'), command.get('animation'),
+                         **command.get('kwargs', {}))
+
+
+def _cmd_set_strand_speed(command: dict):
+    set_strand_speed(command.get('strand'), command.get('speed', 0.025))
+
+
+def _cmd_set_strand_color(command: dict):
+    set_strand_color(command.get('strand'), command.get('color', (255, 255, 255)))
+
+
+def _cmd_set_people_count(command: dict):
+    set_people_count(command.get('count', 0))
+
+
+def _cmd_turn_off_all(command: dict):
+    turn_off_all_leds()
+
+
+# Command handlers keyed by command type
+_COMMAND_HANDLERS: Dict[str, Callable[[dict], None]] = {
+    'set_all_active': _cmd_set_all_active,
+    'set_strand_active': _cmd_set_strand_active,
+    'set_strand_animation': _cmd_set_strand_animation,
+    'set_strand_speed': _cmd_set_strand_speed,
+    'set_strand_color': _cmd_set_strand_color,
+    'set_people_count': _cmd_set_people_count,
+    'turn_off_all': _cmd_turn_off_all,
+}
+
+
 def process_led_command(command: dict):
     """Process a command from the LED queue"""
-    if _shutdown_requested:
+    if _shutdown_event.is_set():
+        _release_command(command)
         return
         
     try:
         cmd_type = command.get('type')
-        
-        if cmd_type == 'set_all_active':
-            active = command.get('active', True)
-            set_all_active(active)
-        
-        elif cmd_type == 'set_strand_active':
-            strand_name = command.get('strand')
-            active = command.get('active', True)
-            set_strand_active(strand_name, active)
-        
-        elif cmd_type == 'set_strand_animation':
-            strand_name = command.get('strand')
-            animation_type = command.get('animation')
-            kwargs = command.get('kwargs', {})
-            set_strand_animation(strand_name, animation_type, **kwargs)
-        
-        elif cmd_type == 'set_strand_speed':
-            strand_name = command.get('strand')
-            speed = command.get('speed', 0.025)
-            set_strand_speed(strand_name, speed)
-        
-        elif cmd_type == 'set_strand_color':
-            strand_name = command.get('strand')
-            color = command.get('color', (255, 255, 255))
-            set_strand_color(strand_name, color)
-        
-        elif cmd_type == 'set_people_count':
-            people_count = command.get('count', 0)
-            set_people_count(people_count)
-        
-        elif cmd_type == 'turn_off_all':
-            turn_off_all_leds()
-        
+        handler = _COMMAND_HANDLERS.get(cmd_type)
+        if handler is not None:
+            handler(command)
         else:
             logging.warning(f"Unknown LED command type: {cmd_type}")
             
     except Exception as e:
         logging.error(f"Error processing LED command: {e}")
+    finally:
+        _release_command(command)
 
 
-def led_control_thread(led_queue: queue.Queue, state: ThreadSafeState):
-    """LED control thread function - SAFE VERSION"""
-    global _shutdown_requested  # Need to access the global variable
-    
+def led_control_thread(led_queue: queue.Queue, state: ThreadSafeState, shared_people=None):
+    """
+    LED control thread function - SAFE VERSION
+
+    Args:
+        led_queue: Queue of LED commands
+        state: Shared application state
+        shared_people: Optional lock-free mp.RawValue('i') holding the local
+            people count, read instead of taking the state lock
+    """
     logging.info("LED control thread starting")
     
     if not NEOPIXEL_AVAILABLE:
@@ -547,7 +929,7 @@ def led_control_thread(led_queue: queue.Queue, state: ThreadSafeState):
     
     # Note: Signal handlers can only be set in the main thread
     # The main thread will set state["should_run"] = False
-    # and we'll check _shutdown_requested set by the main thread
+    # and we'll check _shutdown_event set by the main thread
     
     # Thread control variables
     last_time_check = time.time()
@@ -556,29 +938,45 @@ def led_control_thread(led_queue: queue.Queue, state: ThreadSafeState):
     people_check_interval = 2
     last_people_check = 0
     frame_counter = 0
+    # is_active_time() can only change on the hour, so cache it per hour
+    cached_hour = None
+    time_active = False
+    frame_interval = 0.02  # 50 FPS
+    next_frame = time.monotonic()
+    # Local bindings so the frame loop checks shutdown without a global lookup
+    # or a state lookup
+    shutdown_requested = _shutdown_event.is_set
+    should_run = state.flag("should_run").is_set
     
     logging.info("LED control thread initialized successfully")
     
     try:
-        while state["should_run"] and not _shutdown_requested:
+        while should_run() and not shutdown_requested():
             current_time = time.time()
             
+            hour = int(current_time) // 3600
+            if hour != cached_hour:
+                time_active = is_active_time()
+                cached_hour = hour
+            
             # Check shutdown signal every 25 frames for responsiveness
             if frame_counter % 25 == 0:
-                if not state["should_run"] or _shutdown_requested:
+                if not should_run() or shutdown_requested():
                     break
             
-            # Process commands
-            try:
-                command = led_queue.get_nowait()
-                logging.debug(f"Processing LED command: {command}")
+            # Process all pending commands
+            while True:
+                try:
+                    command = led_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if _logger.isEnabledFor(logging.DEBUG):
+                    _logger.debug("Processing LED command: %s", command)
                 process_led_command(command)
-            except queue.Empty:
-                pass
             
             # Time-based activation check
             if current_time - last_time_check > check_interval:
-                should_be_active = is_active_time()
+                should_be_active = time_active
                 if _led_controller and should_be_active != _led_controller.is_active:
                     logging.info(f"LED activation state changing: {_led_controller.is_active} -> {should_be_active}")
                     set_all_active(should_be_active)
@@ -590,25 +988,49 @@ def led_control_thread(led_queue: queue.Queue, state: ThreadSafeState):
             
             # People count updates
             if current_time - last_people_check > people_check_interval:
-                local_people = state.get("local_num_people", 0)
+                if shared_people is not None:
+                    local_people = shared_people.value
+                else:
+                    local_people = state.get("local_num_people", 0)
                 if local_people != last_people_count:
                     set_people_count(local_people)
                     logging.info(f"Updated LED speed for {local_people} local people")
                     last_people_count = local_people
                 last_people_check = current_time
             
-            # Animation
-            if _led_controller and _led_controller.is_active and is_active_time() and not _shutdown_requested:
+            # Animation - is_active is kept in sync with active hours above
+            if _led_controller and _led_controller.is_active and not shutdown_requested():
                 animate_success = animate_leds()
                 if frame_counter % 100 == 0:  # Log every 100 frames
-                    logging.debug(f"Animation frame {frame_counter}, success: {animate_success}")
-                time.sleep(0.02)  # 50 FPS
+                    _logger.debug("Animation frame %d, success: %s", frame_counter, animate_success)
+                
+                # Sleep until the next frame deadline so render time doesn't
+                # add to the frame interval
+                next_frame += frame_interval
+                sleep_for = next_frame - time.monotonic()
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+                else:
+                    # Fell behind - restart the cadence rather than burst
+                    next_frame = time.monotonic()
             else:
                 if frame_counter % 100 == 0:  # Debug why not animating
-                    logging.debug(f"Not animating: controller={_led_controller is not None}, "
-                                f"active={_led_controller.is_active if _led_controller else False}, "
-                                f"time_active={is_active_time()}, shutdown={_shutdown_requested}")
-                time.sleep(0.1)  # Responsive when inactive
+                    _logger.debug("Not animating: controller=%s, active=%s, time_active=%s, shutdown=%s",
+                                  _led_controller is not None,
+                                  _led_controller.is_active if _led_controller else False,
+                                  time_active, shutdown_requested())
+                
+                # Block on the queue until a command arrives or the next
+                # periodic check is due, instead of polling
+                next_check = min(last_people_check + people_check_interval,
+                                 last_time_check + check_interval)
+                try:
+                    command = led_queue.get(timeout=max(0.0, next_check - time.time()))
+                    if _logger.isEnabledFor(logging.DEBUG):
+                        _logger.debug("Processing LED command: %s", command)
+                    process_led_command(command)
+                except queue.Empty:
+                    pass
             
             frame_counter += 1
             
@@ -623,129 +1045,115 @@ def led_control_thread(led_queue: queue.Queue, state: ThreadSafeState):
         logging.info("LED control thread stopping")
         _emergency_cleanup()
         logging.info(f"LED thread received signal")
-        _shutdown_requested = True
+        _shutdown_event.set()
         state["should_run"] = False
-    
-
-    # Thread control variables
-    last_time_check = 0
-    last_people_count = -1
-    check_interval = 60
-    people_check_interval = 2
-    last_people_check = 0
-    frame_counter = 0
-    
-    logging.info("LED control thread initialized successfully")
-    
-    try:
-        while state["should_run"] and not _shutdown_requested:
-            current_time = time.time()
-            
-            # Check shutdown signal every 25 frames for responsiveness
-            if frame_counter % 25 == 0:
-                if not state["should_run"] or _shutdown_requested:
-                    break
-            
-            # Process commands
-            try:
-                command = led_queue.get_nowait()
-                process_led_command(command)
-            except queue.Empty:
-                pass
-            
-            # Time-based activation check
-            if current_time - last_time_check > check_interval:
-                should_be_active = is_active_time()
-                if _led_controller and should_be_active != _led_controller.is_active:
-                    set_all_active(should_be_active)
-                    if should_be_active:
-                        logging.info("Entering active hours - LEDs enabled")
-                    else:
-                        logging.info("Exiting active hours - LEDs disabled")
-                last_time_check = current_time
-            
-            # People count updates
-            if current_time - last_people_check > people_check_interval:
-                local_people = state.get("local_num_people", 0)
-                if local_people != last_people_count:
-                    set_people_count(local_people)
-                    logging.info(f"Updated LED speed for {local_people} local people")
-                    last_people_count = local_people
-                last_people_check = current_time
-            
-            # Animation
-            if (_led_controller and _led_controller.is_active and 
-                is_active_time() and not _shutdown_requested):
-                
-                animate_leds()
-                time.sleep(0.02)  # 50 FPS
-            else:
-                time.sleep(0.2)  # Responsive when inactive
-            
-            frame_counter += 1
-            
-    except KeyboardInterrupt:
-        logging.info("LED thread received keyboard interrupt")
-    except Exception as e:
-        logging.error(f"Error in LED control thread: {e}")
-    finally:
-        # Cleanup
-        logging.info("LED control thread stopping")
-        _emergency_cleanup()
 
 
 def send_led_command(led_queue: queue.Queue, command: dict):
     """Send a command to the LED controller"""
-    if _shutdown_requested:
+    if _shutdown_event.is_set():
+        _release_command(command)
         return
         
     try:
         led_queue.put_nowait(command)
-        logging.debug(f"Sent LED command: {command}")
+        _logger.debug("Sent LED command: %s", command)
     except queue.Full:
+        _release_command(command)
         logging.warning("LED command queue is full - command dropped")
     except Exception as e:
         logging.error(f"Error sending LED command: {e}")
 
 
-# Convenience functions for queue-based control
+# Convenience functions for queue-based control. Commands are handed over by
+# reference and recycled by process_led_command once handled
 def queue_set_all_active(led_queue: queue.Queue, active: bool = True):
     """Queue command to activate/deactivate all strands"""
-    send_led_command(led_queue, {'type': 'set_all_active', 'active': active})
+    key = 'set_all_active_on' if active else 'set_all_active_off'
+    send_led_command(led_queue, _CMD_POOL[key])
 
 
 def queue_set_strand_active(led_queue: queue.Queue, strand_name: str, active: bool = True):
     """Queue command to activate/deactivate a specific strand"""
-    send_led_command(led_queue, {'type': 'set_strand_active', 'strand': strand_name, 'active': active})
+    command = _acquire_command('set_strand_active')
+    command['strand'] = strand_name
+    command['active'] = active
+    send_led_command(led_queue, command)
 
 
 def queue_set_strand_animation(led_queue: queue.Queue, strand_name: str, animation_type: str, **kwargs):
     """Queue command to set animation for a specific strand"""
-    send_led_command(led_queue, {
-        'type': 'set_strand_animation', 
-        'strand': strand_name, 
-        'animation': animation_type,
-        'kwargs': kwargs
-    })
+    command = _acquire_command('set_strand_animation')
+    command['strand'] = strand_name
+    command['animation'] = animation_type
+    command['kwargs'] = kwargs
+    send_led_command(led_queue, command)
 
 
 def queue_set_strand_speed(led_queue: queue.Queue, strand_name: str, speed: float):
     """Queue command to set speed for a specific strand"""
-    send_led_command(led_queue, {'type': 'set_strand_speed', 'strand': strand_name, 'speed': speed})
+    command = _acquire_command('set_strand_speed')
+    command['strand'] = strand_name
+    command['speed'] = speed
+    send_led_command(led_queue, command)
 
 
 def queue_set_strand_color(led_queue: queue.Queue, strand_name: str, color: tuple):
     """Queue command to set color for a specific strand"""
-    send_led_command(led_queue, {'type': 'set_strand_color', 'strand': strand_name, 'color': color})
+    command = _acquire_command('set_strand_color')
+    command['strand'] = strand_name
+    command['color'] = color
+    send_led_command(led_queue, command)
 
 
 def queue_set_people_count(led_queue: queue.Queue, people_count: int):
     """Queue command to update people-responsive strands"""
-    send_led_command(led_queue, {'type': 'set_people_count', 'count': people_count})
+    command = _acquire_command('set_people_count')
+    command['count'] = people_count
+    send_led_command(led_queue, command)
 
 
-def led_control_process(led_queue, restart_queue):
-    """LED control process function - runs in separate process for isolation"""
+def _set_realtime_scheduling(core: Optional[int] = None, priority: int = 20):
+    """
+    Pin the calling process to one core and give it SCHED_FIFO priority
+
+    Keeps other work from preempting the animation loop mid-frame. For the
+    full effect, reserve the core for it with isolcpus= in cmdline.txt.
+    Each step is skipped with a warning if it isn't permitted (SCHED_FIFO
+    needs root or CAP_SYS_NICE).
+
+    Args:
+        core: CPU to pin to, defaults to the last one
+        priority: SCHED_FIFO priority (1-99)
+    """
+    import os
+    
+    if core is None:
+        core = (os.cpu_count() or 1) - 1
+    
+    try:
+        os.sched_setaffinity(0, {core})
+        logging.info(f"LED process pinned to CPU {core}")
+    except (AttributeError, OSError) as e:
+        logging.warning(f"Could not pin LED process to CPU {core}: {e}")
+    
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        logging.info(f"LED process running with SCHED_FIFO priority {priority}")
+    except (AttributeError, OSError) as e:
+        logging.warning(f"Could not set SCHED_FIFO for LED process: {e}")
+
+
+def led_control_process(led_conn, shared_people=None):
+    """
+    LED control process function - runs in separate process for isolation
+
+    Args:
+        led_conn: Read end of the LED command pipe (see encode_led_command)
+        shared_people: Optional mp.RawValue('i') written by the main process
+            with the local people count. It is a latest-value mailbox read
+            once per frame, so count changes never queue up as commands
+    """
     import multiprocessing as mp
     import os
     import sys
@@ -770,14 +1178,19 @@ def led_control_process(led_queue, restart_queue):
     root_logger.addHandler(console_handler)
     root_logger.setLevel(logging.INFO)
     
+    # Terminal writes happen on a listener thread, started before the
+    # scheduling change so it stays at normal priority
+    log_listener = start_log_listener()
+    
     logging.info("LED control process starting")
-    sys.stdout.flush()  # Make sure this appears immediately
+    
+    _set_realtime_scheduling()
     
     try:
         # Process-local state (separate from main process)
         process_state = {
             "should_run": True,
-            "local_num_people": 0,
+            "local_num_people": None,  # Unset so the first count is always applied
             "is_active": False  # Start as False, wait for activation command
         }
         
@@ -788,68 +1201,79 @@ def led_control_process(led_queue, restart_queue):
         # Initialize LEDs in this process
         if not init_leds():
             logging.error("Failed to initialize LEDs - LED process exiting")
-            sys.stdout.flush()
             return
         
         logging.info("*** LED HARDWARE INITIALIZED ***")
-        sys.stdout.flush()
         
         # Process control variables
         last_time_check = 0
         last_people_count = -1
         check_interval = 60  # Check time every 60 seconds
-        people_check_interval = 2  # Check people count every 2 seconds
-        last_people_check = 0
         frame_counter = 0
+        # is_active_time() can only change on the hour, so cache it per hour
+        cached_hour = None
+        time_active = False
         
         logging.info("LED process initialized successfully")
         
         # Test log to make sure logging is working
         logging.info("*** LED PROCESS LOGGING TEST - YOU SHOULD SEE THIS ***")
         
+        def handle_shutdown(command):
+            logging.info("LED process received shutdown command")
+            process_state["should_run"] = False
+        
+        def handle_people_count(command):
+            people_count = command.get('count', 0)
+            if people_count != process_state["local_num_people"]:
+                process_state["local_num_people"] = people_count
+                set_people_count(people_count)
+                _logger.debug("LED process updated for %d people", people_count)
+        
+        def handle_all_active(command):
+            # Log important commands
+            logging.info(f"*** LED ACTIVATION COMMAND: {command.get('active', False)} ***")
+            process_led_command(command)
+        
+        # Process-level handlers; anything else goes to process_led_command
+        process_handlers = {
+            'shutdown': handle_shutdown,
+            'set_people_count': handle_people_count,
+            'set_all_active': handle_all_active,
+        }
+        
+        def handle_command(command):
+            """Apply one command from the main process"""
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug("LED process received command: %s", command)
+            process_handlers.get(command.get('type'), process_led_command)(command)
+        
+        # Frame deadlines advance by a fixed interval, so time spent rendering
+        # and handling commands doesn't stretch the frame period
+        next_frame = time.monotonic()
+        
         # Main process loop
         while process_state["should_run"]:
             try:
                 current_time = time.time()
                 
-                # Process commands from main process (non-blocking)
-                commands_processed = 0
-                while commands_processed < 10:  # Limit to prevent blocking
-                    try:
-                        command = led_queue.get_nowait()
-                        logging.debug(f"LED process received command: {command}")
-                        
-                        # Handle shutdown command
-                        if command.get('type') == 'shutdown':
-                            logging.info("LED process received shutdown command")
-                            process_state["should_run"] = False
-                            break
-                        
-                        # Handle people count updates
-                        elif command.get('type') == 'set_people_count':
-                            people_count = command.get('count', 0)
-                            if people_count != process_state["local_num_people"]:
-                                process_state["local_num_people"] = people_count
-                                set_people_count(people_count)
-                                logging.debug(f"LED process updated for {people_count} people")
-                        
-                        # Handle other LED commands
-                        else:
-                            # Log important commands
-                            if command.get('type') == 'set_all_active':
-                                active = command.get('active', False)
-                                logging.info(f"*** LED ACTIVATION COMMAND: {active} ***")
-                                sys.stdout.flush()  # Force output to appear immediately
-                            process_led_command(command)
-                        
-                        commands_processed += 1
-                        
-                    except:  # queue.Empty or other queue errors
-                        break
+                hour = int(current_time) // 3600
+                if hour != cached_hour:
+                    time_active = is_active_time()
+                    cached_hour = hour
+                
+                # People count from shared memory. An aligned int load needs no
+                # lock, and only the newest value is ever seen
+                if shared_people is not None:
+                    people_count = shared_people.value
+                    if people_count != process_state["local_num_people"]:
+                        process_state["local_num_people"] = people_count
+                        set_people_count(people_count)
+                        _logger.debug("LED process updated for %d people", people_count)
                 
                 # Time-based activation check - ONLY every 60 seconds
                 if current_time - last_time_check > check_interval:
-                    should_be_active = is_active_time()
+                    should_be_active = time_active
                     if should_be_active != process_state["is_active"]:
                         process_state["is_active"] = should_be_active
                         set_all_active(should_be_active)
@@ -860,33 +1284,54 @@ def led_control_process(led_queue, restart_queue):
                     last_time_check = current_time  # IMPORTANT: Update the timestamp
                 
                 # Track animation state changes for debugging
-                should_animate = process_state["is_active"] and is_active_time()
+                should_animate = process_state["is_active"] and time_active
                 
                 # Log state changes - make it INFO level so it's visible
                 # if frame_counter == 0 or frame_counter % 1500 == 0:  # Every ~50 seconds at 30 FPS
                 #     logging.info(f"*** LED STATE: active={process_state['is_active']}, "
                 #                f"time_active={is_active_time()}, should_animate={should_animate} ***")
-                #     sys.stdout.flush()
                 
-                # Animation
+                # Animation. Per-pixel work is already vectorised in the
+                # NumpyAnimation classes and neopixel_write is C, so each
+                # frame costs only a few Python calls per strand
                 if should_animate:
                     animate_success = animate_leds()
                     if not animate_success and frame_counter % 500 == 0:  # Less frequent error logging
                         logging.warning("LED animation failing consistently")
-                    time.sleep(0.02)  # ~30 FPS (was 50 FPS) - reduced to prevent stuttering
+                    next_frame += 0.02  # ~50 FPS
                 else:
-                    time.sleep(0.2)  # Slower when inactive
+                    next_frame += 0.2  # Slower when inactive
+                
+                now = time.monotonic()
+                if next_frame < now:
+                    # Fell behind - restart the cadence rather than burst
+                    next_frame = now
+                
+                # Wait for commands until the next frame is due. Block on the
+                # pipe, then drain whatever else arrived in one batch
+                while process_state["should_run"]:
+                    remaining = next_frame - time.monotonic()
+                    if remaining <= 0 or not led_conn.poll(remaining):
+                        break
+                    handle_command(decode_led_command(led_conn.recv_bytes()))
+                    
+                    for _ in range(31):  # Cap the batch so a flood can't stall frames
+                        if not process_state["should_run"] or not led_conn.poll():
+                            break
+                        handle_command(decode_led_command(led_conn.recv_bytes()))
                 
                 frame_counter += 1
                 
                 # Heartbeat every 1500 frames (~50 seconds at 30 FPS) - much less frequent
                 # if frame_counter % 1500 == 0:
                 #     logging.info(f"*** LED HEARTBEAT: frame {frame_counter}, animating={should_animate} ***")
-                #     sys.stdout.flush()
                 
             except KeyboardInterrupt:
                 logging.info("LED process received keyboard interrupt")
                 break
+            except EOFError:
+                logging.info("LED command pipe closed by main process")
+                break
             except Exception as e:
                 logging.error(f"Error in LED process main loop: {e}")
                 time.sleep(1)
@@ -906,31 +1351,82 @@ def led_control_process(led_queue, restart_queue):
             pass  # Ignore cleanup errors
         
         logging.info("LED process terminated")
+        log_listener.stop()
 
 
-def send_led_command_mp(led_queue, command):
-    """Send command to LED process (multiprocessing version)"""
+def encode_led_command(command: dict) -> bytes:
+    """Serialize a command for the LED process pipe"""
+    cmd_type = command.get('type')
+    opcode = _WIRE_OPCODES.get(cmd_type)
+    if opcode is None:
+        return pickle.dumps(command, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    if cmd_type == 'set_all_active':
+        payload = 1 if command.get('active', False) else 0
+    elif cmd_type == 'set_people_count':
+        payload = max(-32768, min(32767, int(command.get('count', 0))))
+    else:
+        payload = 0
+    return _WIRE_COMMAND.pack(opcode, payload)
+
+
+def decode_led_command(data: bytes) -> dict:
+    """Deserialize a command received by the LED process"""
+    if data[0] == _PICKLE_MARKER:
+        return pickle.loads(data)
+    
+    opcode, payload = _WIRE_COMMAND.unpack(data)
+    if opcode == 1:
+        return _CMD_POOL['set_all_active_on' if payload else 'set_all_active_off']
+    if opcode == 2:
+        return {'type': 'set_people_count', 'count': payload}
+    if opcode == 3:
+        return _CMD_POOL['turn_off_all']
+    if opcode == 4:
+        return _CMD_POOL['shutdown']
+    raise ValueError(f"Unknown LED command opcode: {opcode}")
+
+
+def send_led_command_mp(led_conn, command):
+    """
+    Send command to LED process (multiprocessing version)
+
+    Args:
+        led_conn: Write end of the LED command pipe
+        command: Command dict
+    """
     try:
-        led_queue.put_nowait(command)
-        logging.debug(f"Sent LED command to process: {command}")
-    except:
-        logging.warning("LED process command queue full - command dropped")
+        data = encode_led_command(command)
+        # Drop the whole command rather than block when a stalled LED process
+        # has let the pipe fill up. The pipe stays blocking, so a command is
+        # never split: a writable pipe has room for PIPE_BUF bytes, enough
+        # for the packed commands, and a larger pickled command waits for
+        # the LED process to read
+        if not select.select((), (led_conn,), (), 0)[1]:
+            logging.warning("LED process command pipe full - command dropped")
+            return
+        led_conn.send_bytes(data)
+        _logger.debug("Sent LED command to process: %s", command)
+    except Exception as e:
+        logging.error(f"Error sending LED command to process: {e}")
 
 
-# Multiprocessing versions of queue functions
-def queue_set_all_active_mp(led_queue, active=True):
+# Multiprocessing versions of queue functions. Commands are encoded before
+# send_led_command_mp returns, so nothing holds on to the dicts afterwards
+def queue_set_all_active_mp(led_conn, active=True):
     """Queue command to activate/deactivate all LED strands (multiprocessing)"""
-    send_led_command_mp(led_queue, {'type': 'set_all_active', 'active': active})
+    key = 'set_all_active_on' if active else 'set_all_active_off'
+    send_led_command_mp(led_conn, _CMD_POOL[key])
 
 
-def queue_set_strand_active_mp(led_queue, strand_name, active=True):
+def queue_set_strand_active_mp(led_conn, strand_name, active=True):
     """Queue command to activate/deactivate a specific strand (multiprocessing)"""
-    send_led_command_mp(led_queue, {'type': 'set_strand_active', 'strand': strand_name, 'active': active})
+    send_led_command_mp(led_conn, {'type': 'set_strand_active', 'strand': strand_name, 'active': active})
 
 
-def queue_set_strand_animation_mp(led_queue, strand_name, animation_type, **kwargs):
+def queue_set_strand_animation_mp(led_conn, strand_name, animation_type, **kwargs):
     """Queue command to set animation for a specific strand (multiprocessing)"""
-    send_led_command_mp(led_queue, {
+    send_led_command_mp(led_conn, {
         'type': 'set_strand_animation', 
         'strand': strand_name, 
         'animation': animation_type,
@@ -938,16 +1434,16 @@ def queue_set_strand_animation_mp(led_queue, strand_name, animation_type, **kwar
     })
 
 
-def queue_set_people_count_mp(led_queue, people_count):
+def queue_set_people_count_mp(led_conn, people_count):
     """Queue command to update people-responsive strands (multiprocessing)"""
-    send_led_command_mp(led_queue, {'type': 'set_people_count', 'count': people_count})
+    send_led_command_mp(led_conn, {'type': 'set_people_count', 'count': people_count})
 
 
-def queue_turn_off_all_mp(led_queue):
+def queue_turn_off_all_mp(led_conn):
     """Queue command to turn off all strands (multiprocessing)"""
-    send_led_command_mp(led_queue, {'type': 'turn_off_all'})
+    send_led_command_mp(led_conn, _CMD_POOL['turn_off_all'])
 
 
-def shutdown_led_process(led_queue):
+def shutdown_led_process(led_conn):
     """Send shutdown command to LED process"""
-    send_led_command_mp(led_queue, {'type': 'shutdown'})
\ No newline at end of file
+    send_led_command_mp(led_conn, _CMD_POOL['shutdown'])
\ No newline at end of file
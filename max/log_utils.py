@@ -0,0 +1,25 @@
+import logging
+import logging.handlers
+import queue
+
+
+def start_log_listener() -> logging.handlers.QueueListener:
+    """
+    Move the root logger's handlers onto a background listener thread
+
+    The root logger is left with a single QueueHandler, so logging calls in
+    the frame loops only enqueue the record; writing to the terminal happens
+    on the listener thread. The existing handlers keep their formatters and
+    levels.
+
+    Returns:
+        The started listener; call stop() on shutdown to flush queued records
+    """
+    root_logger = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *root_logger.handlers, respect_handler_level=True
+    )
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    listener.start()
+    return listener
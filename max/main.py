@@ -1,5 +1,4 @@
 import cv2
-import zmq
 import time
 import threading
 import logging
@@ -7,31 +6,60 @@ import configparser
 import signal
 import multiprocessing as mp
 import os
+import selectors
+import sys
 
-from camera_utils import init_camera, get_frame_for_display
+from camera_utils import CameraWorker, init_camera, get_frame_for_display
 from network_utils import (
     init_connection,
     init_publisher,
-    init_subscriber,
     send_frames,
     receive_frames,
 )
-from led_utils import led_control_process
+from led_utils import led_control_process, send_led_command_mp as send_led_command
 
+from log_utils import start_log_listener
 from state_class import ThreadSafeState
 
-# Initialize the thread-safe state
+# People count shared with the LED process without locks or queue traffic.
+# Single writer (send thread), single reader (LED process). Created before
+# the LED process is forked
+shared_people = mp.RawValue('i', 0)
+
+# Initialize the thread-safe state. The flags and the people count are read
+# in every thread's loop, so they are kept out of the locked dictionary
 app_state = ThreadSafeState(
     {
         "should_run": True,
         "display_local": True,
         "local_num_people": 0,
         "remote_num_people": 0,
-        "last_remote_frame_time": 0,
+        "last_remote_frame_time": 0,  # time.monotonic() of the last remote frame
         "remote_frame": None,
-    }
+        # Last frame the display thread finished showing; see receive_frames
+        "displayed_frame": None,
+        # Notified by the camera worker and receive thread on each new frame
+        "frame_ready": threading.Condition(),
+    },
+    flags=("should_run", "display_local"),
+    counters={"local_num_people": shared_people},
 )
 
+# Longest the display waits for a new frame before handling key presses
+DISPLAY_FRAME_PERIOD = 1 / 30
+
+# Longest shutdown waits for the worker threads to finish
+THREAD_STOP_TIMEOUT = 2
+
+# Longest the main loop sleeps between its health checks when nothing wakes it
+MONITOR_INTERVAL = 1.0
+
+# Write end of the main loop's wakeup pipe, set by main()
+_wakeup_w = None
+
+# PIDs of LED processes that have been started and not yet reaped
+spawned_pids: set[int] = set()
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, 
@@ -43,32 +71,55 @@ def signal_handler(signum, frame):
     logging.info(f"Received signal {signum}, shutting down...")
     app_state["should_run"] = False
 
-def display_frames(camera, state):
+def request_shutdown():
+    """Stop the application from a worker thread and wake the main loop"""
+    app_state["should_run"] = False
+    if _wakeup_w is not None:
+        try:
+            os.write(_wakeup_w, b"\0")
+        except OSError:
+            pass
+
+def display_frames(camera_worker, state):
     """Function for displaying frames"""
     
     cv2.namedWindow('image')
     cv2.moveWindow('image', 200, 200)
     
-    while state["should_run"]:
+    # Producers notify frame_ready when a new frame lands, so the loop sleeps
+    # until there is something to show instead of polling
+    frame_ready = state.get("frame_ready")
+    last_frame = None
+    warned_no_frame = False
+    
+    def has_new_frame():
+        return get_frame_for_display(camera_worker, state) is not last_frame
+    
+    should_run = state.flag("should_run")
+    while should_run.is_set():
         try:
-            # Get the appropriate frame for display
-            frame = get_frame_for_display(camera, state)
+            # Wait at most one frame period so key presses are still handled
+            with frame_ready:
+                frame_ready.wait_for(has_new_frame, timeout=DISPLAY_FRAME_PERIOD)
+            frame = get_frame_for_display(camera_worker, state)
 
             if frame is None:
-                logging.warning("No frame available for display")
-                time.sleep(0.1)
-                continue
-   
-            resized_frame = cv2.resize(frame, (191, 191))
-
-            # Display the frame
-            cv2.imshow("image", resized_frame)
+                if not warned_no_frame:
+                    logging.warning("No frame available for display")
+                    warned_no_frame = True
+            elif frame is not last_frame:
+                # Frames already arrive at DISPLAY_SIZE
+                cv2.imshow("image", frame)
+                last_frame = frame
+                # imshow has copied the frame, so its buffer may be reused
+                state["displayed_frame"] = frame
+                warned_no_frame = False
 
-            # Exit on 'q' key
+            # Pump HighGUI events; exit on 'q' key
             key = cv2.waitKey(1)
             if key == ord("q"):
-                state["should_run"] = False
                 logging.info("User pressed 'q', stopping application")
+                request_shutdown()
 
         except Exception as e:
             logging.error(f"Error in display_frames: {e}")
@@ -92,18 +143,21 @@ def cleanup(zmq_context, publisher, subscriber, led_process=None):
                     led_process.join(timeout=1)
                     
                 logging.info("LED process stopped")
+            if not led_process.is_alive():
+                spawned_pids.discard(led_process.pid)
         except Exception as e:
             logging.warning(f"Error stopping LED process: {e}")
     
-    # Also try to kill any remaining LED processes by name (in case of restarts)
-    try:
-        import subprocess
-        result = subprocess.run(['pkill', '-f', 'led_control_process'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            logging.info("Cleaned up any remaining LED processes")
-    except Exception as e:
-        logging.debug(f"Could not cleanup LED processes by name: {e}")
+    # Also stop any LED processes left over from restarts
+    for pid in spawned_pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+            logging.info(f"Sent SIGTERM to leftover LED process {pid}")
+        except ProcessLookupError:
+            pass
+        except Exception as e:
+            logging.debug(f"Could not stop LED process {pid}: {e}")
+    spawned_pids.clear()
     
     try:
         cv2.destroyAllWindows()
@@ -132,73 +186,61 @@ def cleanup(zmq_context, publisher, subscriber, led_process=None):
     except Exception as e:
         logging.warning(f"Error terminating ZMQ context: {e}")
 
-def monitor_led_process(led_process, led_queue, restart_queue):
-    """Monitor LED process and restart if it crashes"""
-    current_process = led_process
+def restart_led_process(led_rx, led_conn, shared_people=None):
+    """Start a replacement LED process and bring it back to the current state"""
+    logging.warning("LED process died, attempting restart...")
     
-    while app_state["should_run"]:
-        try:
-            if not current_process.is_alive():
-                logging.warning("LED process died, attempting restart...")
-                
-                # Start new LED process
-                new_process = mp.Process(
-                    target=led_control_process,
-                    args=(led_queue, restart_queue),
-                    name="LEDProcess"
-                )
-                new_process.start()
-                
-                # Send restart notification
-                try:
-                    restart_info = {
-                        'new_pid': new_process.pid,
-                        'restart_time': time.time()
-                    }
-                    restart_queue.put_nowait(restart_info)
-                    logging.info(f"LED process restarted with new PID: {new_process.pid}")
-                except Exception as e:
-                    logging.warning(f"Could not send restart notification: {e}")
-                
-                # IMPORTANT: Re-activate LEDs after restart
-                time.sleep(0.5)  # Give process time to initialize
-                send_led_command(led_queue, {'type': 'set_all_active', 'active': True})
-                logging.info("Re-activated LEDs after restart")
-                
-                # Send current people count to new process
-                current_people = app_state.get("local_num_people", 0)
-                send_led_command(led_queue, {'type': 'set_people_count', 'count': current_people})
-                
-                # Update our reference and continue monitoring the new process
-                current_process = new_process
-                
-            time.sleep(1)  # Check every second
-        except Exception as e:
-            logging.error(f"Error in LED process monitor: {e}")
-            time.sleep(1)
-
-def send_led_command(led_queue, command):
-    """Send command to LED process (non-blocking)"""
-    try:
-        led_queue.put_nowait(command)
-        logging.debug(f"Sent LED command: {command}")
-    except:
-        logging.warning("LED command queue full - command dropped")
+    new_process = mp.Process(
+        target=led_control_process,
+        args=(led_rx, shared_people),
+        name="LEDProcess"
+    )
+    new_process.start()
+    spawned_pids.add(new_process.pid)
+    logging.info(f"LED process restarted with new PID: {new_process.pid}")
+    
+    # IMPORTANT: Re-activate LEDs after restart
+    time.sleep(0.5)  # Give process time to initialize
+    send_led_command(led_conn, {'type': 'set_all_active', 'active': True})
+    logging.info("Re-activated LEDs after restart")
+    
+    # The new process picks up the people count from shared_people itself
+    return new_process
 
 def main():
+    global _wakeup_w
+    
+    # Terminal output moves to a listener thread so the frame loops only
+    # enqueue log records
+    log_listener = start_log_listener()
+    
     # Install signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    # Signals and request_shutdown() write a byte to this pipe, so the main
+    # loop blocks in select() until there is something to do
+    main_selector = selectors.DefaultSelector()
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    _wakeup_w = wakeup_w
+    main_selector.register(wakeup_r, selectors.EVENT_READ, "signal")
+    
     camera = None
     imx500 = None
     zmq_context = None
     publisher = None
     led_process = None
     subscriber = None
+    threads = []
 
     try:
         logging.info("Starting MAX application...")
+        # On a free-threaded build (python3.13t) the frame threads run in parallel
+        gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+        logging.info(f"GIL {'enabled' if gil_enabled else 'disabled'}")
         
         # Load configuration
         config = configparser.ConfigParser()
@@ -221,10 +263,13 @@ def main():
         zmq_context = init_connection()
         publisher = init_publisher(zmq_context, config)
 
+        # Camera capture thread feeding the send thread
+        camera_worker = CameraWorker(camera, app_state)
+
         # Video streaming threads
         send_thread = threading.Thread(
             target=send_frames,
-            args=(publisher, camera, imx500, app_state),
+            args=(publisher, camera_worker, imx500, app_state),
             name="SendFrames",
             daemon=True,
         )
@@ -239,77 +284,73 @@ def main():
         
         display_thread = threading.Thread(
             target=display_frames, 
-            args=(camera, app_state), 
+            args=(camera_worker, app_state), 
             name="DisplayFrames",
             daemon=True
         )
 
         # LED Process setup (separate from threads)
-        led_queue = mp.Queue(maxsize=50)  # Multiprocessing queue
-        restart_queue = mp.Queue(maxsize=5)  # For process restart communication
+        # One-way pipe for LED commands: no feeder thread, and the common
+        # commands are packed structs rather than pickles. Commands are
+        # dropped whole when a stalled LED process lets the pipe fill up
+        led_rx, led_conn = mp.Pipe(duplex=False)
         
         led_process = mp.Process(
             target=led_control_process,
-            args=(led_queue, restart_queue),
+            args=(led_rx, shared_people),
             name="LEDProcess"
         )
 
         # Start LED process
         led_process.start()
+        spawned_pids.add(led_process.pid)
         logging.info(f"Started LED process with PID: {led_process.pid}")
 
-        # Start LED process monitor thread (but don't start it manually)
-        monitor_thread = threading.Thread(
-            target=monitor_led_process,
-            args=(led_process, led_queue, restart_queue),
-            name="LEDMonitor",
-            daemon=True
-        )
+        # The process sentinel becomes readable when the LED process exits,
+        # so the main loop wakes on a crash instead of polling is_alive()
+        main_selector.register(led_process.sentinel, selectors.EVENT_READ, "led_process")
 
         # Start all threads together
-        threads = [send_thread, receive_thread, display_thread, monitor_thread]
+        threads = [camera_worker, send_thread, receive_thread, display_thread]
         for thread in threads:
             thread.start()
             logging.info(f"Started thread: {thread.name}")
 
         # Initialize LEDs - they'll start with default animations
         time.sleep(1)  # Give LED process time to start
-        send_led_command(led_queue, {'type': 'set_all_active', 'active': True})
+        send_led_command(led_conn, {'type': 'set_all_active', 'active': True})
         logging.info("Sent initial LED activation command")
 
         logging.info("All threads and processes started")
 
-        # Main monitoring loop
-        last_people_update = 0
-        people_update_interval = 5  # Only update people count every 5 seconds
-        
-        while app_state["should_run"]:
+        # Main monitoring loop. The people count reaches the LED process
+        # through shared_people, so it is no longer queued from here
+        should_run = app_state.flag("should_run")
+        while should_run.is_set():
             try:
-                current_time = time.time()
-                
-                # Check for LED process restarts
-                try:
-                    restart_info = restart_queue.get_nowait()
-                    new_pid = restart_info.get('new_pid')
-                    logging.info(f"Received LED process restart notification: PID {new_pid}")
-                    # Note: We can't update led_process reference easily since monitor has it
-                    # But that's OK - the monitor will handle the new process
-                except:
-                    pass  # No restart messages
-                
                 # Check if ZMQ context is still valid
                 if zmq_context.closed:
                     logging.error("ZMQ context was closed externally!")
                     app_state["should_run"] = False
                     break
-                    
-                # Update LED with people count - but not too frequently
-                if current_time - last_people_update > people_update_interval:
-                    current_people = app_state.get("local_num_people", 0)
-                    send_led_command(led_queue, {'type': 'set_people_count', 'count': current_people})
-                    last_people_update = current_time
                 
-                time.sleep(2)  # Check every 2 seconds
+                # Sleep until a signal, a shutdown request, the LED process
+                # exiting, or the next round of checks is due
+                for key, _ in main_selector.select(timeout=MONITOR_INTERVAL):
+                    if key.data == "signal":
+                        # should_run has already been cleared; just empty
+                        # the pipe so it doesn't stay readable
+                        try:
+                            os.read(wakeup_r, 512)
+                        except BlockingIOError:
+                            pass
+                    elif key.data == "led_process" and should_run.is_set():
+                        main_selector.unregister(led_process.sentinel)
+                        led_process.join(timeout=0)  # Reap the dead process
+                        if not led_process.is_alive():
+                            spawned_pids.discard(led_process.pid)
+                        led_process = restart_led_process(led_rx, led_conn, shared_people)
+                        main_selector.register(led_process.sentinel, selectors.EVENT_READ, "led_process")
                 
             except Exception as e:
                 logging.error(f"Error in main monitoring loop: {e}")
@@ -327,17 +368,28 @@ def main():
         
         # Turn off LEDs before shutdown
         if led_process and led_process.is_alive():
-            send_led_command(led_queue, {'type': 'turn_off_all'})
+            send_led_command(led_conn, {'type': 'turn_off_all'})
             time.sleep(0.5)  # Give time for LEDs to turn off
         
-        # Wait a moment for threads to stop
+        # Wait for the threads to notice should_run, but no longer than
+        # THREAD_STOP_TIMEOUT in total
         logging.info("Waiting for threads to stop...")
-        time.sleep(2)
+        deadline = time.monotonic() + THREAD_STOP_TIMEOUT
+        for thread in threads:
+            if thread.is_alive():
+                thread.join(timeout=max(0, deadline - time.monotonic()))
 
         # Clean up resources (this will also stop the LED process)
         cleanup(zmq_context, publisher, subscriber, led_process)
         
+        signal.set_wakeup_fd(-1)
+        _wakeup_w = None
+        main_selector.close()
+        os.close(wakeup_r)
+        os.close(wakeup_w)
+        
         logging.info("Application shutdown complete")
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
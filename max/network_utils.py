@@ -1,14 +1,42 @@
-import configparser
+import functools
 import logging
+import struct
 import zmq
 import time
-import msgpack
 
 import cv2
 import numpy as np
 
+try:
+    from turbojpeg import TJPF_BGR, TJSAMP_420, TurboJPEG
+    # Raises if the libturbojpeg shared library can't be found
+    _turbojpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except (ImportError, OSError, RuntimeError):
+    TURBOJPEG_AVAILABLE = False
+
 from state_class import ThreadSafeState
-from camera_utils import get_num_people_local
+from camera_utils import DISPLAY_SIZE, capture_frame_with_metadata
+
+# Frames queued per socket before ZeroMQ drops new ones. Frames are live
+# video, so a short queue keeps latency down instead of buffering stale ones
+FRAME_HWM = 4
+
+# How long the receive thread waits for a message before treating it as a miss
+RECEIVE_TIMEOUT_MS = 1000
+
+# Kernel socket buffer size for frame sockets. Room for several large frames
+# so a burst doesn't stall the sender, without holding seconds of video.
+# Linux caps it at net.core.wmem_max / rmem_max
+FRAME_SOCKET_BUFFER = 512 * 1024
+
+# Scaled remote frames are written into this many reused buffers. A new frame
+# is never written into the published one, and is only published once the
+# display has reported the previous one as shown, so two buffers suffice
+REMOTE_FRAME_RING = 2
+
+# Frame metadata: people count and send timestamp, in network byte order
+FRAME_HEADER = struct.Struct("!Id")
 
 
 def init_connection() -> zmq.Context:
@@ -20,6 +48,8 @@ def init_publisher(zmq_context, config) -> zmq.Socket:
     """Initialize ZeroMQ publisher socket for sending frames"""
     local_port = int(config["LOCAL"]["port"])
     publisher = zmq_context.socket(zmq.PUB)
+    publisher.setsockopt(zmq.SNDHWM, FRAME_HWM)
+    publisher.setsockopt(zmq.SNDBUF, FRAME_SOCKET_BUFFER)
     publisher.bind(f"tcp://*:{local_port}")
     logging.info(f"Publisher bound to port {local_port}")
     return publisher
@@ -33,7 +63,8 @@ def init_subscriber(zmq_context, config) -> zmq.Socket:
     
     # Set socket options BEFORE connecting
     subscriber.setsockopt_string(zmq.SUBSCRIBE, "")  # Subscribe to all messages
-    subscriber.setsockopt(zmq.RCVTIMEO, 1000)  # 1000ms timeout
+    subscriber.setsockopt(zmq.RCVHWM, FRAME_HWM)
+    subscriber.setsockopt(zmq.RCVBUF, FRAME_SOCKET_BUFFER)
     subscriber.setsockopt(zmq.RECONNECT_IVL, 100)  # Reconnect interval in ms
     subscriber.setsockopt(zmq.RECONNECT_IVL_MAX, 1000)  # Max reconnect interval
     
@@ -57,30 +88,41 @@ def recreate_subscriber(old_subscriber, zmq_context, config) -> zmq.Socket:
 # ---------------------- Send Frame Functions ----------------------
 
 
+@functools.lru_cache(maxsize=None)
+def _cv2_encode_params(quality):
+    """Build the cv2.imencode parameters once per quality"""
+    return [
+        cv2.IMWRITE_JPEG_QUALITY, quality,
+        cv2.IMWRITE_JPEG_OPTIMIZE, 0,  # Disable optimization for speed
+    ]
+
+
 def encode_frame(frame, quality=30):
     """
     Encode a frame for network transmission
 
+    Uses libjpeg-turbo through PyTurboJPEG when it is installed, since
+    OpenCV wheels may be built without its NEON code paths.
+
     Args:
         frame: OpenCV frame to encode
         quality: JPEG quality (0-100)
 
     Returns:
-        bytes: Encoded frame data or None if encoding failed
+        bytes or numpy.ndarray: Encoded JPEG buffer or None if encoding
+        failed. It is sent as-is, without copying
     """
     try:
-        # Fast encoding parameters
-        encode_params = [
-            cv2.IMWRITE_JPEG_QUALITY, quality,
-            cv2.IMWRITE_JPEG_OPTIMIZE, 0,  # Disable optimization for speed
-        ]
-
-        _, encoded_frame = cv2.imencode(
-            ".jpg", frame, encode_params
-        )
-        frame_data = encoded_frame.tobytes()
-        logging.debug(f"Encoded frame to {len(frame_data)} bytes")
-        return frame_data
+        if TURBOJPEG_AVAILABLE:
+            encoded_frame = _turbojpeg.encode(
+                frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420
+            )
+        else:
+            _, encoded_frame = cv2.imencode(
+                ".jpg", frame, _cv2_encode_params(quality)
+            )
+        logging.debug("Encoded frame to %d bytes", len(encoded_frame))
+        return encoded_frame
     except Exception as e:
         logging.error(f"Error encoding frame: {e}")
         return None
@@ -94,11 +136,10 @@ def create_frame_metadata(people_count):
         people_count: Number of people detected in the frame
 
     Returns:
-        bytes: Packed metadata
+        bytes: Metadata packed as FRAME_HEADER
     """
-    metadata_dict = {"people_count": people_count, "timestamp": time.time()}
-    packed_metadata = msgpack.packb(metadata_dict)
-    logging.debug(f"Created metadata with {people_count} people")
+    packed_metadata = FRAME_HEADER.pack(people_count, time.time())
+    logging.debug("Created metadata with %d people", people_count)
     return packed_metadata
 
 
@@ -109,60 +150,84 @@ def publish_frame(publisher, metadata, frame_data):
     Args:
         publisher: ZeroMQ publisher socket
         metadata: Packed metadata
-        frame_data: Encoded frame data
+        frame_data: Encoded frame buffer
 
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        publisher.send_multipart([metadata, frame_data])
-        logging.debug(f"Published frame with {len(frame_data)} bytes")
+        # Zero-copy: ZeroMQ references the JPEG buffer instead of copying it
+        # (pyzmq still copies parts below its copy threshold, like metadata)
+        publisher.send_multipart([metadata, frame_data], copy=False, track=False)
+        logging.debug("Published frame with %d bytes", len(frame_data))
         return True
     except Exception as e:
         logging.error(f"Error publishing frame: {e}")
         return False
 
 
-def send_frames(publisher, camera, imx500, state: ThreadSafeState):
-    """Function for capturing and sending frames"""
+def send_frames(publisher, camera_worker, imx500, state: ThreadSafeState):
+    """
+    Function for capturing and sending frames
 
-    frame_count = 0
+    Args:
+        publisher: ZeroMQ publisher socket
+        camera_worker: CameraWorker providing frames and metadata
+        imx500: IMX500 device for inference outputs
+        state: Shared application state
+    """
+
+    if TURBOJPEG_AVAILABLE:
+        logging.info("JPEG codec: libjpeg-turbo (PyTurboJPEG)")
+    else:
+        logging.info(
+            "JPEG codec: OpenCV. Install the turbojpeg extra and libturbojpeg "
+            "to use libjpeg-turbo"
+        )
 
-    while state["should_run"]:
+    frame_count = 0
+    should_run = state.flag("should_run")
+    # Per-frame calls bound once as locals. Debug messages use %-style
+    # arguments so nothing is formatted unless debug logging is on
+    capture = capture_frame_with_metadata
+    encode = encode_frame
+    pack_metadata = create_frame_metadata
+    publish = publish_frame
+    debug = logging.debug
+
+    while should_run.is_set():
         try:
-            # Get frame from camera
-            local_frame = camera.capture_array()
+            # Get frame and people count from camera
+            local_frame, people_count = capture(camera_worker, imx500)
             if local_frame is None:
                 logging.error(f"Failed to capture frame {frame_count}")
                 time.sleep(0.5)
                 continue
 
-            logging.debug(
-                f"Captured frame {frame_count} with shape: {local_frame.shape}"
+            debug(
+                "Captured frame %d with shape: %s", frame_count, local_frame.shape
             )
 
-            # Get people count
-            metadata = camera.capture_metadata()
-            people_count = get_num_people_local(metadata, imx500)
-
             # Update state
             state["local_num_people"] = people_count
 
-            # Encode frame
-            frame_data = encode_frame(local_frame)
+            # Encode frame. The encoded buffer doesn't refer to the frame, so
+            # the camera worker may reuse the frame's buffer from here on
+            frame_data = encode(local_frame)
+            camera_worker.release()
             if frame_data is None:
                 continue
 
             # Create metadata
-            packed_metadata = create_frame_metadata(people_count)
+            packed_metadata = pack_metadata(people_count)
 
             # Publish frame
-            if publish_frame(publisher, packed_metadata, frame_data):
-                logging.debug(f"Sent frame {frame_count}")
+            if publish(publisher, packed_metadata, frame_data):
+                debug("Sent frame %d", frame_count)
                 frame_count += 1
 
-            # Sleep to control frame rate
-            time.sleep(0.033)  # ~30 FPS
+            # No sleep here: camera_worker.get() blocks until the next
+            # capture, so the camera frame rate paces this loop
 
         except Exception as e:
             logging.error(f"Error in send_frames: {e}")
@@ -172,22 +237,29 @@ def send_frames(publisher, camera, imx500, state: ThreadSafeState):
 # ---------------------- Receive Frame Functions ----------------------
 
 
-def receive_message(subscriber):
+def receive_message(subscriber, poller):
     """
     Receive a message from the subscriber
 
     Args:
         subscriber: ZeroMQ subscriber socket
+        poller: zmq.Poller with the subscriber registered for POLLIN
 
     Returns:
-        tuple: (packed_metadata, frame_data) or (None, None) if failed
+        tuple: (packed_metadata, frame_data) as memoryviews onto the received
+        ZeroMQ frames, or (None, None) if failed
     """
     try:
-        message_parts = subscriber.recv_multipart()
-        logging.debug(f"Received message with {len(message_parts)} parts")
+        # The only blocking wait in the receive thread
+        if not poller.poll(RECEIVE_TIMEOUT_MS):
+            logging.debug("Timeout waiting for message")
+            return None, None
+
+        message_parts = subscriber.recv_multipart(zmq.NOBLOCK, copy=False)
+        logging.debug("Received message with %d parts", len(message_parts))
 
         if len(message_parts) == 2:
-            return message_parts[0], message_parts[1]
+            return message_parts[0].buffer, message_parts[1].buffer
         else:
             logging.warning(f"Unexpected message format: {len(message_parts)} parts")
             return None, None
@@ -208,36 +280,113 @@ def unpack_metadata(packed_metadata):
     Unpack metadata from a received message
 
     Args:
-        packed_metadata: Packed metadata bytes
+        packed_metadata: Metadata packed as FRAME_HEADER
 
     Returns:
-        dict: Unpacked metadata or empty dict if failed
+        tuple: (people_count, timestamp) or (0, 0.0) if failed
     """
     try:
-        metadata = msgpack.unpackb(packed_metadata)
-        logging.debug(f"Unpacked metadata: {metadata}")
+        metadata = FRAME_HEADER.unpack_from(packed_metadata)
+        logging.debug("Unpacked metadata: %s", metadata)
         return metadata
     except Exception as e:
         logging.error(f"Error unpacking metadata: {e}")
-        return {}
+        return 0, 0.0
+
 
+# cv2.imdecode flags decoding at 1/denominator of the full size
+_CV2_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
 
-def decode_frame(frame_data):
+# JPEG start-of-frame markers (SOF0-SOF15, except DHT, JPG and DAC), which
+# carry the image size
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_JPEG_SEGMENT = struct.Struct(">BBH")
+_JPEG_SOF_SIZE = struct.Struct(">BHH")
+
+
+def _jpeg_size(frame_data):
+    """
+    Read (width, height) from a JPEG's start-of-frame segment
+
+    Args:
+        frame_data: Encoded frame data
+
+    Returns:
+        tuple: (width, height), or None if no start-of-frame segment was found
+    """
+    pos = 2  # Skip SOI
+    end = len(frame_data) - _JPEG_SEGMENT.size - _JPEG_SOF_SIZE.size
+    while pos <= end:
+        prefix, marker, length = _JPEG_SEGMENT.unpack_from(frame_data, pos)
+        if prefix != 0xFF:
+            return None
+        if marker in _JPEG_SOF_MARKERS:
+            _, height, width = _JPEG_SOF_SIZE.unpack_from(
+                frame_data, pos + _JPEG_SEGMENT.size
+            )
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def _decode_scale(width, height, min_size):
+    """
+    Pick the smallest scaled-IDCT denominator that still covers min_size,
+    so large frames aren't fully decoded only to be scaled down
+
+    Args:
+        width: Encoded frame width
+        height: Encoded frame height
+        min_size: (width, height) the decoded frame must not be smaller than
+
+    Returns:
+        int: 8, 4, 2 or 1
+    """
+    min_w, min_h = min_size
+    for denominator in (8, 4, 2):
+        if width // denominator >= min_w and height // denominator >= min_h:
+            return denominator
+    return 1
+
+
+def decode_frame(frame_data, min_size=None):
     """
     Decode a frame from received data
 
     Args:
         frame_data: Encoded frame data
+        min_size: Optional (width, height) the frame will be scaled down to.
+            Larger frames are decoded at a reduced size that still covers it
 
     Returns:
         numpy.ndarray: Decoded frame or None if failed
     """
     try:
-        frame = cv2.imdecode(
-            np.frombuffer(frame_data, dtype=np.uint8), cv2.IMREAD_COLOR
-        )
+        if TURBOJPEG_AVAILABLE:
+            denominator = 1
+            if min_size is not None:
+                width, height, _, _ = _turbojpeg.decode_header(frame_data)
+                denominator = _decode_scale(width, height, min_size)
+            frame = _turbojpeg.decode(
+                frame_data, pixel_format=TJPF_BGR, scaling_factor=(1, denominator)
+            )
+        else:
+            denominator = 1
+            if min_size is not None:
+                size = _jpeg_size(frame_data)
+                if size is not None:
+                    denominator = _decode_scale(*size, min_size)
+            frame = cv2.imdecode(
+                np.frombuffer(frame_data, dtype=np.uint8),
+                _CV2_REDUCED_FLAGS[denominator],
+            )
         if frame is not None:
-            logging.debug(f"Decoded frame with shape: {frame.shape}")
+            logging.debug("Decoded frame with shape: %s", frame.shape)
         else:
             logging.warning("Frame decoded as None")
         return frame
@@ -252,7 +401,7 @@ def update_view_state(state: ThreadSafeState, current_time):
 
     Args:
         state: Application state
-        current_time: Current time
+        current_time: Current time.monotonic() reading
 
     Returns:
         bool: True if view was switched to local, False otherwise
@@ -274,15 +423,34 @@ def receive_frames(state: ThreadSafeState, zmq_context, config):
     last_reconnect_time = 0
     reconnect_interval = 5  # Reconnect every 5 seconds if failing
     subscriber = init_subscriber(zmq_context, config)  # <-- Creates subscriber here
-
-    while state["should_run"]:
+    poller = zmq.Poller()
+    poller.register(subscriber, zmq.POLLIN)
+    frame_ready = state.get("frame_ready")  # Wakes the display thread
+    should_run = state.flag("should_run")
+    display_w, display_h = DISPLAY_SIZE
+    remote_frames = [
+        np.empty((display_h, display_w, 3), dtype=np.uint8)
+        for _ in range(REMOTE_FRAME_RING)
+    ]
+    # Buffer currently in state["remote_frame"], which the display may be reading
+    published = None
+    # Per-frame calls bound once as locals
+    receive = receive_message
+    unpack = unpack_metadata
+    decode = decode_frame
+    resize = cv2.resize
+    # Monotonic, so the view timeout and reconnect interval don't jump with
+    # NTP adjustments. The wire timestamp in the metadata stays wall-clock
+    now = time.monotonic
+
+    while should_run.is_set():
         try:
             # Receive message
-            packed_metadata, frame_data = receive_message(subscriber)
+            packed_metadata, frame_data = receive(subscriber, poller)
             
             if packed_metadata is None:
                 consecutive_failures += 1
-                current_time = time.time()
+                current_time = now()
                 
                 # Update view state (switch to local if timeout)
                 update_view_state(state, current_time)
@@ -292,7 +460,9 @@ def receive_frames(state: ThreadSafeState, zmq_context, config):
                 if (consecutive_failures > 10 and 
                     current_time - last_reconnect_time > reconnect_interval):
                     logging.warning(f"Too many consecutive failures ({consecutive_failures}), recreating subscriber")
+                    poller.unregister(subscriber)
                     subscriber = recreate_subscriber(subscriber, zmq_context, config)
+                    poller.register(subscriber, zmq.POLLIN)
                     last_reconnect_time = current_time
                     consecutive_failures = 0
                 
@@ -302,24 +472,39 @@ def receive_frames(state: ThreadSafeState, zmq_context, config):
             consecutive_failures = 0
 
             # Unpack metadata
-            metadata = unpack_metadata(packed_metadata)
-            remote_people_count = metadata.get("people_count", 0)
+            remote_people_count, _ = unpack(packed_metadata)
 
-            # Decode frame
-            frame = decode_frame(frame_data)
+            # Decode frame and scale it for display here, off the display thread
+            frame = decode(frame_data, DISPLAY_SIZE)
             if frame is None:
                 continue
-
-            # Update state - only use lock when actually updating
-            with state.lock:
-                # Log if switching from local to remote
-                if state.get("display_local", True):
-                    logging.info("Switched to remote view - connection restored")
-                
-                state["remote_frame"] = frame
-                state["remote_num_people"] = remote_people_count
-                state["last_remote_frame_time"] = time.time()
-                state["display_local"] = False  # Switch to remote view
+            dst = next(buf for buf in remote_frames if buf is not published)
+            frame = resize(frame, DISPLAY_SIZE, dst=dst, interpolation=cv2.INTER_AREA)
+
+            # Log if switching from local to remote. Only this thread
+            # switches to remote or times the view out, so the check
+            # doesn't need the lock
+            if state["display_local"]:
+                logging.info("Switched to remote view - connection restored")
+
+            updates = {
+                "remote_num_people": remote_people_count,
+                "last_remote_frame_time": now(),
+                "display_local": False,  # Switch to remote view
+            }
+            # Publish only once the display has finished with the previous
+            # frame, so a buffer is never overwritten while it's being shown.
+            # Until then each newer frame replaces this one in the spare buffer
+            if published is None or state.get("displayed_frame") is published:
+                updates["remote_frame"] = frame
+                published = frame
+
+            # One lock acquisition for all the frame's fields
+            state.update(updates)
+
+            if frame_ready is not None:
+                with frame_ready:
+                    frame_ready.notify_all()
 
         except Exception as e:
             logging.error(f"Error in receive_frames: {e}")
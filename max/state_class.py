@@ -1,21 +1,48 @@
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional
 
 
 class ThreadSafeState:
     """
     A thread-safe state container that provides dictionary-like access.
+
+    Single-key reads and writes don't take the lock, since a single dict
+    operation is already atomic. The lock only groups multi-key updates and
+    snapshots. Hot scalar fields can also be kept out of the dictionary:
+    boolean flags are backed by threading.Event and integer counters by
+    ctypes ints.
     """
 
-    def __init__(self, initial_state: Optional[Dict[str, Any]] = None):
+    def __init__(
+        self,
+        initial_state: Optional[Dict[str, Any]] = None,
+        flags: Iterable[str] = (),
+        counters: Optional[Dict[str, Any]] = None,
+    ):
         """
         Initialize the state container.
 
         Args:
             initial_state: Initial state dictionary
+            flags: Keys holding booleans, stored as threading.Event
+            counters: Keys mapped to ctypes ints (e.g. multiprocessing.RawValue('i'))
+                that store integer values; the objects are used as-is, so
+                they can be shared with other processes
         """
         self._lock = threading.RLock()
-        self._state = initial_state or {}
+        self._state = dict(initial_state or {})
+        self._flags = {}
+        self._counters = dict(counters or {})
+
+        for key in flags:
+            event = threading.Event()
+            if self._state.pop(key, False):
+                event.set()
+            self._flags[key] = event
+
+        for key, counter in self._counters.items():
+            if key in self._state:
+                counter.value = self._state.pop(key)
 
     def __getitem__(self, key: str) -> Any:
         """
@@ -27,8 +54,13 @@ class ThreadSafeState:
         Returns:
             The value for the key
         """
-        with self._lock:
-            return self._state[key]
+        flag = self._flags.get(key)
+        if flag is not None:
+            return flag.is_set()
+        counter = self._counters.get(key)
+        if counter is not None:
+            return counter.value
+        return self._state[key]
 
     def __setitem__(self, key: str, value: Any) -> None:
         """
@@ -38,8 +70,18 @@ class ThreadSafeState:
             key: The state key to set
             value: The value to set
         """
-        with self._lock:
-            self._state[key] = value
+        flag = self._flags.get(key)
+        if flag is not None:
+            if value:
+                flag.set()
+            else:
+                flag.clear()
+            return
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter.value = value
+            return
+        self._state[key] = value
 
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -52,8 +94,13 @@ class ThreadSafeState:
         Returns:
             The value from state or default
         """
-        with self._lock:
-            return self._state.get(key, default)
+        flag = self._flags.get(key)
+        if flag is not None:
+            return flag.is_set()
+        counter = self._counters.get(key)
+        if counter is not None:
+            return counter.value
+        return self._state.get(key, default)
 
     def update(self, updates: Dict[str, Any]) -> None:
         """
@@ -62,7 +109,17 @@ class ThreadSafeState:
         Args:
             updates: Dictionary of key-value pairs to update
         """
+        flags = self._flags
+        counters = self._counters
         with self._lock:
+            if flags or counters:
+                plain = {}
+                for key, value in updates.items():
+                    if key in flags or key in counters:
+                        self[key] = value
+                    else:
+                        plain[key] = value
+                updates = plain
             self._state.update(updates)
 
     def get_all(self) -> Dict[str, Any]:
@@ -73,13 +130,31 @@ class ThreadSafeState:
             A copy of the current state dictionary
         """
         with self._lock:
-            return dict(self._state)
+            snapshot = dict(self._state)
+        snapshot.update((key, flag.is_set()) for key, flag in self._flags.items())
+        snapshot.update((key, counter.value) for key, counter in self._counters.items())
+        return snapshot
+
+    def flag(self, key: str) -> threading.Event:
+        """
+        Get the Event backing a flag, for loops that check it every iteration.
+
+        Args:
+            key: A key registered in flags
+
+        Returns:
+            The Event; is_set() reads the flag without any dictionary lookup
+        """
+        return self._flags[key]
 
     @property
     def lock(self):
         """
         Get the state lock for use in with statements.
 
+        Holding it keeps update() and get_all() from interleaving with a
+        group of writes; single-key access doesn't wait for it.
+
         Returns:
             The lock object
         """
@@ -1,62 +1,292 @@
+import os
+import selectors
 import socket
-import subprocess
-import platform
+import struct
 import logging
 import configparser
+import errno
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, Any, List, Tuple
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+# Linux ioctl returning an interface's IPv4 address
+SIOCGIFADDR = 0x8915
+
 
 def check_network_interfaces() -> List[Dict[str, Any]]:
-    """Get information about network interfaces"""
+    """
+    Get information about network interfaces
+
+    On Linux each interface's IPv4 address is read from the kernel, so no
+    hostname lookup is involved and every interface is listed rather than
+    only the address the hostname resolves to. Elsewhere the addresses the
+    hostname resolves to are listed.
+    """
     interfaces = []
 
     try:
-        # Get all interfaces with their IP addresses
-        hostname = socket.gethostname()
-        ip_addresses = socket.getaddrinfo(hostname, None)
-
-        # Filter to just get IPv4 addresses
-        for ip in ip_addresses:
-            if ip[0] == socket.AF_INET:  # IPv4
-                interfaces.append({"address": ip[4][0], "family": "IPv4"})
+        if not (FCNTL_AVAILABLE and sys.platform.startswith("linux")):
+            hostname = socket.gethostname()
+            for ip in socket.getaddrinfo(
+                hostname, None, socket.AF_INET, socket.SOCK_STREAM
+            ):
+                interfaces.append({"name": hostname, "address": ip[4][0], "family": "IPv4"})
+            return interfaces
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for _, name in socket.if_nameindex():
+                request = struct.pack("256s", name.encode()[:15])
+                try:
+                    reply = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)
+                except OSError:
+                    # Interface is down or has no IPv4 address
+                    continue
+                address = socket.inet_ntoa(reply[20:24])
+                interfaces.append({"name": name, "address": address, "family": "IPv4"})
     except Exception as e:
         logging.error(f"Error checking network interfaces: {e}")
 
     return interfaces
 
 
-def ping_host(host: str, count: int = 4) -> Tuple[bool, str]:
-    """Ping a host and return success status and output"""
-    param = "-n" if platform.system().lower() == "windows" else "-c"
-    command = ["ping", param, str(count), host]
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+# type, code, checksum, identifier, sequence
+ICMP_HEADER = struct.Struct("!BBHHH")
+# Send time carried in the echo payload
+ICMP_PAYLOAD = struct.Struct("!d")
+
+
+def _icmp_checksum(data: bytes) -> int:
+    """RFC 1071 one's-complement checksum"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _icmp_ping(
+    sock: socket.socket, address: str, count: int, timeout: float
+) -> Tuple[bool, str]:
+    """
+    Send `count` echo requests back to back and wait for the replies
+
+    `sock` is an unprivileged ICMP datagram socket, so no root is needed as
+    long as net.ipv4.ping_group_range includes our group. The kernel
+    rewrites the identifier and only delivers replies to our own requests.
+    The socket is closed on return.
+    """
+    ident = os.getpid() & 0xFFFF
+    sent = {}
+    rtts = []
+
+    with sock:
+        sock.setblocking(False)
+        for seq in range(count):
+            sent_at = time.monotonic()
+            payload = ICMP_PAYLOAD.pack(sent_at)
+            header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+            checksum = _icmp_checksum(header + payload)
+            header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, ident, seq)
+            sock.sendto(header + payload, (address, 0))
+            sent[seq] = sent_at
+
+        deadline = time.monotonic() + timeout
+        with selectors.DefaultSelector() as selector:
+            selector.register(sock, selectors.EVENT_READ)
+            while sent and selector.select(max(0, deadline - time.monotonic())):
+                packet = sock.recv(1024)
+                received_at = time.monotonic()
+                if len(packet) < ICMP_HEADER.size:
+                    continue
+                icmp_type, _, _, _, seq = ICMP_HEADER.unpack_from(packet)
+                if icmp_type == ICMP_ECHO_REPLY and seq in sent:
+                    rtts.append((received_at - sent.pop(seq)) * 1000)
+
+    output = f"{count} packets transmitted, {len(rtts)} received"
+    if rtts:
+        output += (
+            f", rtt min/avg/max = {min(rtts):.3f}/"
+            f"{sum(rtts) / len(rtts):.3f}/{max(rtts):.3f} ms"
+        )
+    return bool(rtts), output
+
+
+def _tcp_ping(host: str, timeout: float) -> Tuple[bool, str]:
+    """
+    Probe a host with a TCP connect to the echo port
+
+    A refused connection still means the host answered.
+    """
+    try:
+        with socket.create_connection((host, 7), timeout=timeout):
+            return True, "TCP probe: host accepted a connection on port 7"
+    except ConnectionRefusedError:
+        return True, "TCP probe: host refused port 7, so it is reachable"
+    except OSError as e:
+        return False, f"TCP probe failed: {e}"
+
+
+def ping_host(host: str, count: int = 4, timeout: float = 2.0) -> Tuple[bool, str]:
+    """
+    Ping a host and return success status and output
+
+    Sends ICMP echo requests from Python rather than running the ping
+    binary. Falls back to a TCP probe where unprivileged ICMP sockets
+    aren't allowed or aren't supported at all.
+    """
+    try:
+        address = socket.gethostbyname(host)
+    except OSError as e:
+        return False, str(e)
+
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except OSError as e:
+        logging.debug("ICMP sockets unavailable (%s), falling back to a TCP probe", e)
+        return _tcp_ping(address, timeout)
 
     try:
-        output = subprocess.check_output(command, universal_newlines=True)
-        return True, output
-    except subprocess.CalledProcessError as e:
-        return False, e.output
+        return _icmp_ping(sock, address, count, timeout)
     except Exception as e:
         return False, str(e)
 
 
+# SO_LINGER on with a zero timeout: close() resets the connection
+_LINGER_RESET = struct.pack("ii", 1, 0)
+
+# connect_ex results meaning a non-blocking connect is still in progress.
+# Windows reports WSAEWOULDBLOCK
+_CONNECT_IN_PROGRESS = frozenset(
+    err
+    for err in (
+        errno.EINPROGRESS,
+        errno.EWOULDBLOCK,
+        getattr(errno, "WSAEWOULDBLOCK", None),
+    )
+    if err is not None
+)
+
+
 def check_port_open(host: str, port: int, timeout: float = 2.0) -> bool:
-    """Check if a TCP port is open on a host"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(timeout)
+    """
+    Check if a TCP port is open on a host
+
+    The probe connection is closed with a reset rather than a FIN
+    exchange, so repeated checks don't leave sockets in TIME_WAIT.
+    """
+    return check_ports_open(host, [port], timeout)[port]
+
+
+def check_ports_open(host: str, ports: List[int], timeout: float = 2.0) -> Dict[int, bool]:
+    """
+    Check several TCP ports on a host at once
+
+    All connections are started together and awaited with one selector, so
+    the check takes at most `timeout` however many ports are given.
+    """
+    results = {port: False for port in ports}
+    pending = {}
+
+    with selectors.DefaultSelector() as selector:
+        try:
+            address = socket.gethostbyname(host)
+            for port in results:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                try:
+                    # The selector does the waiting instead of a per-socket
+                    # settimeout()
+                    sock.setblocking(False)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RESET)
+                    err = sock.connect_ex((address, port))
+                    if err in _CONNECT_IN_PROGRESS:
+                        selector.register(sock, selectors.EVENT_WRITE, port)
+                        pending[port] = sock
+                        sock = None
+                    else:
+                        # Connected or refused straight away
+                        results[port] = err == 0
+                finally:
+                    # Closed here unless it was handed to the selector
+                    if sock is not None:
+                        sock.close()
+
+            deadline = time.monotonic() + timeout
+            while pending:
+                ready = selector.select(max(0, deadline - time.monotonic()))
+                if not ready:
+                    break
+                for key, _ in ready:
+                    sock = key.fileobj
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    results[key.data] = err == 0
+                    selector.unregister(sock)
+                    sock.close()
+                    del pending[key.data]
+        except Exception as e:
+            logging.error(f"Error checking ports {ports} on {host}: {e}")
+        finally:
+            # Ports still connecting when time ran out count as closed
+            for sock in pending.values():
+                sock.close()
+
+    return results
+
+
+# Longest run_network_diagnostics waits for any one probe
+PROBE_TIMEOUT = 5.0
+
+# Parsed config files keyed by path, with the (mtime_ns, size) they were read at
+_config_cache: Dict[str, Tuple[Tuple[int, int], configparser.ConfigParser]] = {}
 
-    try:
-        result = sock.connect_ex((host, port))
-        return result == 0  # 0 means port is open
-    except Exception as e:
-        logging.error(f"Error checking port {port} on {host}: {e}")
-        return False
-    finally:
-        sock.close()
 
+def _load_config(config_path: str, st: os.stat_result = None) -> configparser.ConfigParser:
+    """
+    Parse a config file, reusing the last parse while the file is unchanged
 
-def run_network_diagnostics(config_path: str = "config.ini") -> Dict[str, Any]:
-    """Run comprehensive network diagnostics and return results"""
+    The returned parser is shared between calls, so callers must not
+    modify it. A missing file gives an empty parser, like
+    ConfigParser.read(). Pass `st` if the caller has just stat'ed the file.
+    """
+    if st is None:
+        try:
+            st = os.stat(config_path)
+        except OSError:
+            _config_cache.pop(config_path, None)
+            return configparser.ConfigParser()
+
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _config_cache.get(config_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    _config_cache[config_path] = (key, config)
+    return config
+
+
+def run_network_diagnostics(
+    config_path: str = "config.ini", config_stat: os.stat_result = None
+) -> Dict[str, Any]:
+    """
+    Run comprehensive network diagnostics and return results
+
+    The probes are independent, so they run concurrently and the total
+    time is that of the slowest probe rather than the sum of all of them.
+    config_stat is an optional os.stat() of config_path, saving a second
+    stat when the caller already has one.
+    """
     results = {
         "local_interfaces": [],
         "remote_ping": {"success": False, "output": ""},
@@ -65,83 +295,119 @@ def run_network_diagnostics(config_path: str = "config.ini") -> Dict[str, Any]:
         "timestamp": time.time(),
     }
 
-    # Get local network interfaces
-    results["local_interfaces"] = check_network_interfaces()
-
-    # Load configuration
-    config = configparser.ConfigParser()
-    config.read(config_path)
-
+    # Not a with block, so a slow probe doesn't hold up the results. A running
+    # probe can't be interrupted and is still joined at interpreter exit, but
+    # each one gives up after its own 2 s timeout (hostname lookups aside)
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="Probe")
     try:
-        remote_ip = config["REMOTE"]["ip"]
-        remote_port = int(config["REMOTE"]["port"])
-        local_port = int(config["LOCAL"]["port"])
-
-        results["config"] = {
-            "remote_ip": remote_ip,
-            "remote_port": remote_port,
-            "local_port": local_port,
-        }
-
-        # Check if we can ping the remote host
-        ping_success, ping_output = ping_host(remote_ip)
-        results["remote_ping"] = {"success": ping_success, "output": ping_output}
-
-        # Check if the remote port is open
-        port_open = check_port_open(remote_ip, remote_port)
-        results["remote_port_check"] = port_open
-
-    except Exception as e:
-        logging.error(f"Error in network diagnostics: {e}")
-        results["error"] = str(e)
+        # Get local network interfaces
+        interfaces = executor.submit(check_network_interfaces)
+
+        # Load configuration
+        config = _load_config(config_path, config_stat)
+
+        try:
+            remote_ip = config["REMOTE"]["ip"]
+            remote_port = int(config["REMOTE"]["port"])
+            local_port = int(config["LOCAL"]["port"])
+            # Optional comma-separated ports to check alongside the main one
+            extra_ports = [
+                int(port)
+                for port in config["REMOTE"].get("extra_ports", "").split(",")
+                if port.strip()
+            ]
+
+            results["config"] = {
+                "remote_ip": remote_ip,
+                "remote_port": remote_port,
+                "local_port": local_port,
+            }
+
+            # Ping the remote host and check its ports at the same time
+            ping = executor.submit(ping_host, remote_ip)
+            port_check = executor.submit(
+                check_ports_open, remote_ip, [remote_port, *extra_ports]
+            )
+
+            try:
+                ping_success, ping_output = ping.result(timeout=PROBE_TIMEOUT)
+            except FutureTimeoutError:
+                ping_success, ping_output = False, "Ping timed out"
+            results["remote_ping"] = {"success": ping_success, "output": ping_output}
+
+            try:
+                results["remote_ports"] = port_check.result(timeout=PROBE_TIMEOUT)
+                results["remote_port_check"] = results["remote_ports"][remote_port]
+            except FutureTimeoutError:
+                logging.error(f"Port check on {remote_ip}:{remote_port} timed out")
+
+        except Exception as e:
+            logging.error(f"Error in network diagnostics: {e}")
+            results["error"] = str(e)
+
+        try:
+            results["local_interfaces"] = interfaces.result(timeout=PROBE_TIMEOUT)
+        except FutureTimeoutError:
+            logging.error("Listing network interfaces timed out")
+    finally:
+        # Drop any probe that hasn't started yet
+        executor.shutdown(wait=False, cancel_futures=True)
 
     return results
 
 
 def print_diagnostic_results(results: Dict[str, Any]) -> None:
     """Print diagnostic results in a readable format"""
-    print("\n===== NETWORK DIAGNOSTICS =====")
+    # Built up and written with a single print
+    lines = []
+    lines.append("\n===== NETWORK DIAGNOSTICS =====")
 
     # Print local interfaces
-    print("\nLocal Network Interfaces:")
+    lines.append("\nLocal Network Interfaces:")
     for interface in results["local_interfaces"]:
-        print(f"  {interface['family']}: {interface['address']}")
+        lines.append(f"  {interface['name']} {interface['family']}: {interface['address']}")
 
     # Print configuration
     if "config" in results:
         config = results["config"]
-        print("\nConfiguration:")
-        print(f"  Local Port: {config.get('local_port', 'Not found')}")
-        print(f"  Remote IP: {config.get('remote_ip', 'Not found')}")
-        print(f"  Remote Port: {config.get('remote_port', 'Not found')}")
+        lines.append("\nConfiguration:")
+        lines.append(f"  Local Port: {config.get('local_port', 'Not found')}")
+        lines.append(f"  Remote IP: {config.get('remote_ip', 'Not found')}")
+        lines.append(f"  Remote Port: {config.get('remote_port', 'Not found')}")
 
     # Print ping results
     ping = results["remote_ping"]
-    print("\nPing to Remote Host:")
-    print(f"  Success: {ping['success']}")
+    lines.append("\nPing to Remote Host:")
+    lines.append(f"  Success: {ping['success']}")
     if not ping["success"]:
-        print(f"  Output: {ping['output']}")
+        lines.append(f"  Output: {ping['output']}")
 
     # Print port check
-    print("\nRemote Port Check:")
-    print(f"  Port Open: {results['remote_port_check']}")
+    lines.append("\nRemote Port Check:")
+    lines.append(f"  Port Open: {results['remote_port_check']}")
+    remote_port = results.get("config", {}).get("remote_port")
+    for port, is_open in results.get("remote_ports", {}).items():
+        if port != remote_port:
+            lines.append(f"  Port {port} Open: {is_open}")
 
     # Print recommendations
-    print("\nRecommendations:")
+    lines.append("\nRecommendations:")
     if not ping["success"]:
-        print("  - Check network connectivity between devices")
-        print("  - Verify the remote IP address is correct")
-        print("  - Ensure both devices are on the same network")
+        lines.append("  - Check network connectivity between devices")
+        lines.append("  - Verify the remote IP address is correct")
+        lines.append("  - Ensure both devices are on the same network")
 
     if not results["remote_port_check"]:
-        print("  - Check if the remote device is running the application")
-        print("  - Verify the port configuration is correct")
-        print("  - Check for firewalls blocking the connection")
+        lines.append("  - Check if the remote device is running the application")
+        lines.append("  - Verify the port configuration is correct")
+        lines.append("  - Check for firewalls blocking the connection")
 
     if ping["success"] and results["remote_port_check"]:
-        print("  - Network connectivity looks good!")
+        lines.append("  - Network connectivity looks good!")
+
+    lines.append("\n===============================\n")
 
-    print("\n===============================\n")
+    print("\n".join(lines))
 
 
 if __name__ == "__main__":
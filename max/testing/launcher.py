@@ -1,5 +1,4 @@
 import argparse
-import logging
 import sys
 import os
 
@@ -28,14 +27,20 @@ def main():
 
     args = parser.parse_args()
 
+    # Imported after parsing so --help and usage errors skip it. Each
+    # subcommand's own modules are imported only when it runs
+    import logging
+
     # Configure logging
     log_level = logging.DEBUG if args.debug else logging.INFO
     logging.basicConfig(
         level=log_level, format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
-    # Check if config file exists
-    if not os.path.exists(args.config):
+    # Check if config file exists. The stat result is reused by diagnostics
+    try:
+        config_stat = os.stat(args.config)
+    except FileNotFoundError:
         logging.error(f"Config file not found: {args.config}")
         sys.exit(1)
 
@@ -48,16 +53,19 @@ def main():
 
     elif args.command == "test":
         logging.info("Running network connectivity test")
-        from max.testing.network_test import test_connection
+        from max.testing.network_test import shutdown_zmq, test_connection
 
-        success = test_connection(args.config, args.debug)
+        try:
+            success = test_connection(args.config, args.debug)
+        finally:
+            shutdown_zmq()
         sys.exit(0 if success else 1)
 
     elif args.command == "diagnose":
         logging.info("Running network diagnostics")
         from max.testing.diagnostics import run_network_diagnostics, print_diagnostic_results
 
-        results = run_network_diagnostics(args.config)
+        results = run_network_diagnostics(args.config, config_stat)
         print_diagnostic_results(results)
 
         # Exit with code based on connectivity
@@ -1,3 +1,4 @@
+import os
 import zmq
 import configparser
 import time
@@ -5,8 +6,22 @@ import msgpack
 import threading
 import logging
 import argparse
+import signal
 from state_class import ThreadSafeState
 
+# One I/O thread per four cores is plenty for the test's traffic
+ZMQ_IO_THREADS = max(1, (os.cpu_count() or 1) // 4)
+
+
+def get_zmq_context() -> zmq.Context:
+    """Get the process-wide ZeroMQ context, shared by every test run"""
+    return zmq.Context.instance(io_threads=ZMQ_IO_THREADS)
+
+
+def shutdown_zmq():
+    """Terminate the shared ZeroMQ context once no test is running"""
+    get_zmq_context().term()
+
 
 def test_connection(config_path="config.ini", debug=False):
     """Test ZeroMQ connection between publisher and subscriber"""
@@ -18,7 +33,12 @@ def test_connection(config_path="config.ini", debug=False):
 
     # Shared state
     state = ThreadSafeState(
-        {"running": True, "sent_count": 0, "received_count": 0, "last_received_time": 0}
+        {
+            "sent_count": 0,
+            "received_count": 0,
+            # time.monotonic_ns() of the last received message, 0 if none yet
+            "last_received_time": 0,
+        }
     )
 
     # Load configuration
@@ -34,91 +54,151 @@ def test_connection(config_path="config.ini", debug=False):
     logging.info(f"Remote IP: {remote_ip}")
     logging.info(f"Remote port: {remote_port}")
 
-    # Initialize ZeroMQ context
-    context = zmq.Context()
+    # Shared context, so repeated runs don't each start and stop I/O threads
+    context = get_zmq_context()
+
+    # libzmq already disables Nagle on every TCP connection. Short
+    # keepalives make a silently dropped link fail and reconnect within
+    # seconds instead of looking connected for hours. Set before
+    # bind/connect so they apply to the connections
+    def enable_keepalive(sock):
+        sock.setsockopt(zmq.TCP_KEEPALIVE, 1)
+        sock.setsockopt(zmq.TCP_KEEPALIVE_IDLE, 5)
+        sock.setsockopt(zmq.TCP_KEEPALIVE_INTVL, 1)
+        sock.setsockopt(zmq.TCP_KEEPALIVE_CNT, 3)
 
     # Create publisher socket
     publisher = context.socket(zmq.PUB)
+    enable_keepalive(publisher)
     publisher.bind(f"tcp://*:{local_port}")
     logging.info(f"Publisher bound to port {local_port}")
 
     # Create subscriber socket
     subscriber = context.socket(zmq.SUB)
+    enable_keepalive(subscriber)
     subscriber.connect(f"tcp://{remote_ip}:{remote_port}")
     subscriber.setsockopt_string(zmq.SUBSCRIBE, "")  # Subscribe to all messages
-    subscriber.setsockopt(zmq.RCVTIMEO, 5000)  # 5000ms timeout
     logging.info(f"Subscriber connected to {remote_ip}:{remote_port}")
 
     # Allow time for connection to establish
     logging.info("Waiting for connection to establish...")
     time.sleep(2)  # ZeroMQ connections need a moment to initialize
 
+    # Set on Ctrl+C; the workers wait on it so they stop immediately
+    stop = threading.Event()
+
     # Function to send test messages
     def send_test_messages():
-        while state["running"]:
+        # Packers aren't thread-safe, so each thread keeps its own
+        packer = msgpack.Packer()
+        # The message map always has the same keys, so pack everything but
+        # the counter text and timestamp once. The bytes match packing the
+        # whole dict, so receivers see no difference
+        prefix = (
+            packer.pack_map_header(3)
+            + packer.pack("type")
+            + packer.pack("test")
+            + packer.pack("message")
+        )
+        timestamp_key = packer.pack("timestamp")
+        # Only this thread writes sent_count, so count locally and publish
+        message_count = state["sent_count"]
+        while not stop.is_set():
             try:
-                message_count = state["sent_count"]
-                test_message = msgpack.packb(
-                    {
-                        "type": "test",
-                        "message": f"Test message {message_count}",
-                        "timestamp": time.time(),
-                    }
+                test_message = b"".join(
+                    (
+                        prefix,
+                        packer.pack(f"Test message {message_count}"),
+                        timestamp_key,
+                        packer.pack(time.time()),
+                    )
                 )
                 publisher.send(test_message)
-                logging.info(f"Sent test message {message_count}")
-                state["sent_count"] = message_count + 1
-                time.sleep(1)
+                logging.info("Sent test message %d", message_count)
+                message_count += 1
+                state["sent_count"] = message_count
+                stop.wait(1)
             except Exception as e:
-                logging.error(f"Error sending test message: {e}")
-                time.sleep(1)
+                logging.error("Error sending test message: %s", e)
+                stop.wait(1)
 
     # Function to receive test messages
     def receive_test_messages():
-        while state["running"]:
+        # Short polls so the thread notices shutdown promptly
+        poller = zmq.Poller()
+        poller.register(subscriber, zmq.POLLIN)
+        # Only this thread writes received_count, so count locally and
+        # publish once per batch
+        received_count = state["received_count"]
+        while not stop.is_set():
             try:
-                message = subscriber.recv()
-                try:
-                    data = msgpack.unpackb(message)
-                    state["last_received_time"] = time.time()
-                    state["received_count"] = state["received_count"] + 1
-                    logging.info(f"Received message: {data}")
-                except Exception as e:
-                    logging.error(f"Error unpacking message: {e}")
+                if not poller.poll(timeout=50):
+                    continue
+
+                # Drain everything that arrived in one wakeup
+                received = []
+                while True:
+                    try:
+                        message = subscriber.recv(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    try:
+                        received.append(msgpack.unpackb(message))
+                    except Exception as e:
+                        logging.error("Error unpacking message: %s", e)
+
+                if received:
+                    received_count += len(received)
+                    state.update(
+                        {
+                            "received_count": received_count,
+                            "last_received_time": time.monotonic_ns(),
+                        }
+                    )
+                    if len(received) == 1:
+                        logging.info("Received message: %s", received[0])
+                    else:
+                        logging.info("Received %d messages: %s", len(received), received)
             except zmq.ZMQError as e:
                 if e.errno == zmq.EAGAIN:
                     logging.debug("Timeout waiting for message")
                 else:
-                    logging.error(f"ZMQ error: {e}")
+                    logging.error("ZMQ error: %s", e)
             except Exception as e:
-                logging.error(f"Error receiving message: {e}")
-                time.sleep(0.5)
+                logging.error("Error receiving message: %s", e)
+                stop.wait(0.5)
 
     # Function to monitor connection status
     def monitor_connection():
-        last_report_time = time.time()
+        report_interval_ns = 5_000_000_000
+        last_report_time = time.monotonic_ns()
         last_received_count = 0
 
-        while state["running"]:
+        while not stop.is_set():
             # Report status every 5 seconds
-            current_time = time.time()
-            if current_time - last_report_time >= 5:
-                received_count = state["received_count"]
+            current_time = time.monotonic_ns()
+            if current_time - last_report_time >= report_interval_ns:
+                # One consistent snapshot per report
+                snapshot = state.get_all()
+                received_count = snapshot["received_count"]
                 messages_since_last = received_count - last_received_count
 
                 logging.info(
-                    f"Status: Sent {state['sent_count']} messages, Received {received_count} messages"
+                    "Status: Sent %d messages, Received %d messages",
+                    snapshot["sent_count"],
+                    received_count,
                 )
                 logging.info(
-                    f"Messages received in last 5 seconds: {messages_since_last}"
+                    "Messages received in last 5 seconds: %d", messages_since_last
                 )
 
                 if messages_since_last == 0:
-                    last_received_time = state["last_received_time"]
+                    last_received_time = snapshot["last_received_time"]
                     if last_received_time > 0:
-                        time_since_last = current_time - last_received_time
+                        time_since_last = (current_time - last_received_time) / 1e9
                         logging.warning(
-                            f"No messages received in last 5 seconds. Time since last message: {time_since_last:.2f}s"
+                            "No messages received in last 5 seconds. Time since last message: %.2fs",
+                            time_since_last,
                         )
                     else:
                         logging.warning("No messages received yet")
@@ -126,24 +206,27 @@ def test_connection(config_path="config.ini", debug=False):
                 last_report_time = current_time
                 last_received_count = received_count
 
-            time.sleep(1)
+            stop.wait(1)
 
-    # Start threads
-    sender_thread = threading.Thread(target=send_test_messages)
-    receiver_thread = threading.Thread(target=receive_test_messages)
-    monitor_thread = threading.Thread(target=monitor_connection)
+    # Sleep until Ctrl+C instead of waking every second to check for it. The
+    # handler goes in before the threads start, so an early Ctrl+C also stops
+    # them instead of leaving them running
+    previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    try:
+        # Start threads
+        sender_thread = threading.Thread(target=send_test_messages)
+        receiver_thread = threading.Thread(target=receive_test_messages)
+        monitor_thread = threading.Thread(target=monitor_connection)
 
-    sender_thread.start()
-    receiver_thread.start()
-    monitor_thread.start()
+        sender_thread.start()
+        receiver_thread.start()
+        monitor_thread.start()
 
-    try:
         logging.info("Press Ctrl+C to stop")
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
+        stop.wait()
         logging.info("Stopping test...")
-        state["running"] = False
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
 
     # Wait for threads to finish
     sender_thread.join(timeout=2)
@@ -151,9 +234,10 @@ def test_connection(config_path="config.ini", debug=False):
     monitor_thread.join(timeout=2)
 
     # Clean up
-    publisher.close()
-    subscriber.close()
-    context.term()
+    # The context is shared and stays up; see shutdown_zmq(). Linger 0, so
+    # terminating it later doesn't wait on messages nobody will receive
+    publisher.close(linger=0)
+    subscriber.close(linger=0)
 
     # Report final statistics
     logging.info("Test complete")
@@ -172,4 +256,7 @@ if __name__ == "__main__":
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     args = parser.parse_args()
 
-    test_connection(args.config, args.debug)
+    try:
+        test_connection(args.config, args.debug)
+    finally:
+        shutdown_zmq()